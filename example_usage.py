@@ -8,11 +8,63 @@ common tasks including authentication, sending messages, and handling events.
 import asyncio
 import logging
 import os
+import random
+import time
+from functools import lru_cache
 from pathlib import Path
 
 from whatsapp_web_py import WhatsAppClient, MessageType, MessageEvent
 from whatsapp_web_py.utils.logger import setup_logging
 
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+
+HELP_TEXT = """
+🤖 WhatsApp Bot Commands:
+
+/help - Show this help message
+/ping - Check if bot is responding
+/echo <message> - Echo your message back
+/info - Get bot information
+/time - Get current time
+/joke - Get a random joke
+/quit - Stop the bot (admin only)
+""".strip()
+
+INFO_TEMPLATE = """
+ℹ️ Bot Information:
+• Name: WhatsApp Bot
+• Version: 1.0.0
+• Status: Running
+• Session: {session}
+""".strip()
+
+JOKES = (
+    "Why don't scientists trust atoms? Because they make up everything!",
+    "Why did the scarecrow win an award? He was outstanding in his field!",
+    "Why don't eggs tell jokes? They'd crack each other up!",
+    "What do you call a fake noodle? An impasta!",
+    "Why did the math book look so sad? Because it had too many problems!"
+)
+
+JOKE_REPLIES = tuple(f"😄 {joke}" for joke in JOKES)
+
+
+@lru_cache(maxsize=1)
+def format_time(second: int) -> str:
+    """Format a whole-second timestamp, reusing the result within that second."""
+    return time.strftime("%Y-%m-%d %H:%M:%S", time.localtime(second))
+
+
+def run(main):
+    """Run a coroutine on uvloop when available, else the default loop."""
+    if uvloop is not None:
+        return uvloop.run(main)
+    return asyncio.run(main)
+
 
 class WhatsAppBot:
     """Example WhatsApp bot implementation."""
@@ -33,6 +85,23 @@ class WhatsAppBot:
         
         # Bot state
         self.is_running = False
+        self._stop_event = asyncio.Event()
+        self._info_text = INFO_TEMPLATE.format(session=session_file)
+        
+        # Command dispatch table
+        self._commands = {
+            "/help": self._cmd_help,
+            "/ping": self._cmd_ping,
+            "/info": self._cmd_info,
+            "/time": self._cmd_time,
+            "/joke": self._cmd_joke,
+            "/quit": self._cmd_quit,
+        }
+        
+        # Commands that take an argument after a space
+        self._argument_commands = {
+            "/echo": self._cmd_echo,
+        }
 
     def handle_qr_code(self, qr_data: str):
         """Handle QR code generation for authentication."""
@@ -84,58 +153,15 @@ class WhatsAppBot:
         text = text.strip().lower()
         
         try:
-            if text == "/help":
-                help_text = """
-🤖 WhatsApp Bot Commands:
-
-/help - Show this help message
-/ping - Check if bot is responding
-/echo <message> - Echo your message back
-/info - Get bot information
-/time - Get current time
-/joke - Get a random joke
-/quit - Stop the bot (admin only)
-                """
-                await self.client.send_text_message(jid, help_text.strip())
-                
-            elif text == "/ping":
-                await self.client.send_text_message(jid, "🏓 Pong!")
-                
-            elif text.startswith("/echo "):
-                echo_text = text[6:]  # Remove "/echo "
-                await self.client.send_text_message(jid, f"📢 Echo: {echo_text}")
-                
-            elif text == "/info":
-                info_text = f"""
-ℹ️ Bot Information:
-• Name: WhatsApp Bot
-• Version: 1.0.0
-• Status: Running
-• Session: {self.session_file}
-                """
-                await self.client.send_text_message(jid, info_text.strip())
-                
-            elif text == "/time":
-                import datetime
-                current_time = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-                await self.client.send_text_message(jid, f"🕐 Current time: {current_time}")
-                
-            elif text == "/joke":
-                jokes = [
-                    "Why don't scientists trust atoms? Because they make up everything!",
-                    "Why did the scarecrow win an award? He was outstanding in his field!",
-                    "Why don't eggs tell jokes? They'd crack each other up!",
-                    "What do you call a fake noodle? An impasta!",
-                    "Why did the math book look so sad? Because it had too many problems!"
-                ]
-                import random
-                joke = random.choice(jokes)
-                await self.client.send_text_message(jid, f"😄 {joke}")
+            handler = self._commands.get(text)
+            command, separator, argument = text.partition(" ")
+            argument_handler = self._argument_commands.get(command) if separator else None
+            
+            if handler:
+                await handler(jid)
                 
-            elif text == "/quit":
-                # Only allow admin to quit (you can implement admin check)
-                await self.client.send_text_message(jid, "👋 Goodbye! Bot shutting down...")
-                self.is_running = False
+            elif argument_handler:
+                await argument_handler(jid, argument)
                 
             else:
                 # Unknown command
@@ -148,6 +174,37 @@ class WhatsAppBot:
             print(f"Error handling command: {e}")
             await self.client.send_text_message(jid, "❌ Sorry, an error occurred processing your command.")
 
+    async def _cmd_help(self, jid: str):
+        """Reply with the list of commands."""
+        await self.client.send_text_message(jid, HELP_TEXT)
+
+    async def _cmd_ping(self, jid: str):
+        """Reply to a ping."""
+        await self.client.send_text_message(jid, "🏓 Pong!")
+
+    async def _cmd_echo(self, jid: str, echo_text: str):
+        """Echo the user's text back."""
+        await self.client.send_text_message(jid, f"📢 Echo: {echo_text}")
+
+    async def _cmd_info(self, jid: str):
+        """Reply with bot information."""
+        await self.client.send_text_message(jid, self._info_text)
+
+    async def _cmd_time(self, jid: str):
+        """Reply with the current time."""
+        current_time = format_time(int(time.time()))
+        await self.client.send_text_message(jid, f"🕐 Current time: {current_time}")
+
+    async def _cmd_joke(self, jid: str):
+        """Reply with a random joke."""
+        await self.client.send_text_message(jid, random.choice(JOKE_REPLIES))
+
+    async def _cmd_quit(self, jid: str):
+        """Stop the bot."""
+        # Only allow admin to quit (you can implement admin check)
+        await self.client.send_text_message(jid, "👋 Goodbye! Bot shutting down...")
+        self.stop()
+
     async def start(self):
         """Start the bot."""
         print("🚀 Starting WhatsApp Bot...")
@@ -159,11 +216,11 @@ class WhatsAppBot:
             print("✅ Bot started successfully!")
             self.is_running = True
             
-            # Keep the bot running
+            # Keep the bot running until stop() is called
             try:
-                while self.is_running:
-                    await asyncio.sleep(1)
+                await self._stop_event.wait()
             except KeyboardInterrupt:
+                self.stop()
                 print("\n⏹️ Bot stopped by user")
         else:
             print("❌ Failed to start bot")
@@ -171,6 +228,11 @@ class WhatsAppBot:
         # Stop the client
         await self.client.stop()
 
+    def stop(self):
+        """Signal the bot to stop."""
+        self.is_running = False
+        self._stop_event.set()
+
     async def send_media_example(self, jid: str):
         """Example of sending media messages."""
         try:
@@ -274,7 +336,7 @@ async def advanced_usage_example():
             message_stats['media'] += 1
             
         # Log message details
-        logging.info(f"Message processed: {event.type.value} from {event.jid}")
+        logging.info("Message processed: %s from %s", event.type.value, event.jid)
         
         # Print stats every 10 messages
         if message_stats['total'] % 10 == 0:
@@ -313,7 +375,7 @@ async def advanced_usage_example():
                 print("\n⏹️ Shutting down...")
                 
     except Exception as e:
-        logging.error(f"Error in advanced example: {e}")
+        logging.error("Error in advanced example: %s", e)
 
 
 def main():
@@ -338,15 +400,15 @@ def main():
         if choice == "1":
             # Interactive bot
             bot = WhatsAppBot()
-            asyncio.run(bot.start())
+            run(bot.start())
             
         elif choice == "2":
             # Basic usage
-            asyncio.run(basic_usage_example())
+            run(basic_usage_example())
             
         elif choice == "3":
             # Advanced usage
-            asyncio.run(advanced_usage_example())
+            run(advanced_usage_example())
             
         elif choice == "4":
             print("👋 Goodbye!")
@@ -0,0 +1,107 @@
+"""
+Tests for WebSocketConnection against a local websockets server.
+"""
+
+import asyncio
+import unittest
+from unittest import mock
+
+from websockets.asyncio.server import serve
+
+from whatsapp_web_py.websocket import connection
+from whatsapp_web_py.websocket.connection import WebSocketConnection
+
+
+class WebSocketConnectionTest(unittest.IsolatedAsyncioTestCase):
+    """Connection lifecycle tests."""
+
+    async def test_reconnect_from_handler_keeps_new_writer(self):
+        """A handler that reconnects must not lose the new connection's writer."""
+        received = []
+        connections = 0
+        
+        async def server(ws):
+            nonlocal connections
+            connections += 1
+            if connections == 1:
+                await ws.send(b'reconnect')
+            async for message in ws:
+                received.append(message)
+                
+        async with serve(server, 'localhost', 0) as srv:
+            port = srv.sockets[0].getsockname()[1]
+            conn = WebSocketConnection(f'ws://localhost:{port}')
+            reconnected = asyncio.Event()
+            
+            async def on_message(message):
+                if message == b'reconnect':
+                    self.assertTrue(await conn.connect())
+                    reconnected.set()
+                    
+            conn.on_message = on_message
+            self.assertTrue(await conn.connect())
+            await asyncio.wait_for(reconnected.wait(), 5)
+            
+            # Let the old dispatcher reach its close sentinel
+            await asyncio.sleep(0.1)
+            
+            self.assertTrue(conn.is_connected)
+            await asyncio.wait_for(conn.send(b'after'), 5)
+            await conn.close()
+            
+        self.assertEqual(connections, 2)
+        self.assertEqual(received, [b'after'])
+
+    
+    async def test_keepalive_drops_unresponsive_server(self):
+        """A server that stops answering pings is reported through on_close."""
+        closed = asyncio.Event()
+        
+        async def server(ws):
+            # Stop reading, so pings are never answered
+            ws.transport.pause_reading()
+            await closed.wait()
+            ws.transport.abort()
+            
+        async with serve(server, 'localhost', 0) as srv:
+            port = srv.sockets[0].getsockname()[1]
+            conn = WebSocketConnection(f'ws://localhost:{port}')
+            
+            async def on_close():
+                closed.set()
+                
+            conn.on_close = on_close
+            with mock.patch.object(connection, 'PING_INTERVAL', 0.05), \
+                    mock.patch.object(connection, 'PING_TIMEOUT', 0.05):
+                self.assertTrue(await conn.connect())
+                await asyncio.wait_for(closed.wait(), 2)
+                
+            self.assertFalse(conn.is_connected)
+            await conn.close()
+
+    async def test_close_sends_frames_already_queued(self):
+        """Frames accepted before close() are sent ahead of the close frame."""
+        received = []
+        
+        async def server(ws):
+            async for message in ws:
+                received.append(message)
+                
+        async with serve(server, 'localhost', 0) as srv:
+            port = srv.sockets[0].getsockname()[1]
+            conn = WebSocketConnection(f'ws://localhost:{port}')
+            self.assertTrue(await conn.connect())
+            
+            frames = [bytes([i]) * 1024 for i in range(100)]
+            sends = [asyncio.create_task(conn.send(frame)) for frame in frames]
+            await asyncio.sleep(0)
+            await conn.close()
+            
+            results = await asyncio.gather(*sends, return_exceptions=True)
+            self.assertEqual(results, [None] * len(frames))
+            
+        self.assertEqual(received, frames)
+
+
+if __name__ == '__main__':
+    unittest.main()
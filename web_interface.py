@@ -2,22 +2,103 @@
 Web Interface for WhatsApp Web Python Library
 
 Provides a simple web interface for QR code display, session management,
-and basic message monitoring using Flask.
+and basic message monitoring using Quart. The HTTP server and the WhatsApp
+client run on the same event loop.
 """
 
 import asyncio
 import json
 import logging
 import os
-import threading
-from datetime import datetime
-from typing import Dict, Any, List, Optional
-from flask import Flask, render_template, request, jsonify, redirect, url_for
-from werkzeug.serving import make_server
+from collections import deque
+from datetime import datetime, timezone
+from functools import lru_cache
+from itertools import islice
+from typing import Deque, Dict, Any, Optional
+import orjson
 
 from whatsapp_web_py import WhatsAppClient, MessageType, MessageEvent
 from whatsapp_web_py.utils.logger import setup_logging
-from whatsapp_web_py.auth.qr_auth import QRAuth
+
+try:
+    import uvloop
+except ImportError:
+    uvloop = None
+
+logger = logging.getLogger(__name__)
+
+# Cookie-signing key, generated once per process
+_SECRET_KEY = os.urandom(24)
+
+
+_UTC = timezone.utc
+
+
+@lru_cache(maxsize=4096)
+def _iso(timestamp: int) -> str:
+    """Format a whole-second timestamp as UTC ISO 8601, memoized per second."""
+    return datetime.fromtimestamp(timestamp, _UTC).isoformat(timespec='seconds')
+
+
+def _format_text(content: Any, message_type: MessageType) -> str:
+    return str(content)
+
+
+def _format_image(content: Any, message_type: MessageType) -> str:
+    caption = content.get('caption', '') if isinstance(content, dict) else ''
+    return f"📷 Image: {caption}" if caption else "📷 Image"
+
+
+def _format_video(content: Any, message_type: MessageType) -> str:
+    caption = content.get('caption', '') if isinstance(content, dict) else ''
+    return f"🎥 Video: {caption}" if caption else "🎥 Video"
+
+
+def _format_document(content: Any, message_type: MessageType) -> str:
+    filename = content.get('fileName', 'Document') if isinstance(content, dict) else 'Document'
+    return f"📄 {filename}"
+
+
+def _format_unknown(content: Any, message_type: MessageType) -> str:
+    return f"[{message_type.value}]"
+
+
+# Display formatters keyed by message type
+_FORMATTERS = {
+    MessageType.TEXT: _format_text,
+    MessageType.IMAGE: _format_image,
+    MessageType.VIDEO: _format_video,
+    MessageType.AUDIO: lambda content, message_type: "🎵 Audio message",
+    MessageType.DOCUMENT: _format_document,
+    MessageType.STICKER: lambda content, message_type: "🎭 Sticker",
+    MessageType.LOCATION: lambda content, message_type: "📍 Location",
+    MessageType.CONTACT: lambda content, message_type: "👤 Contact",
+}
+
+
+def _orjson_provider(app):
+    """Build a JSON provider for ``app`` that serializes with orjson."""
+    from quart.json.provider import DefaultJSONProvider
+    
+    class ORJSONProvider(DefaultJSONProvider):
+        """JSON provider that serializes with orjson."""
+        
+        def dumps(self, obj: Any, **kwargs: Any) -> str:
+            """Serialize data as JSON to a string."""
+            return orjson.dumps(obj, default=self.default).decode('utf-8')
+        
+        def loads(self, s, **kwargs: Any) -> Any:
+            """Deserialize JSON from a string or bytes."""
+            return orjson.loads(s)
+        
+        def response(self, *args: Any, **kwargs: Any):
+            """Build a JSON response straight from orjson's bytes output."""
+            obj = self._prepare_response_obj(args, kwargs)
+            return self._app.response_class(
+                orjson.dumps(obj, default=self.default), mimetype=self.mimetype
+            )
+    
+    return ORJSONProvider(app)
 
 
 class WhatsAppWebInterface:
@@ -28,47 +109,54 @@ class WhatsAppWebInterface:
         self.host = host
         self.port = port
         
-        # Flask app
-        self.app = Flask(__name__)
-        self.app.secret_key = os.urandom(24)
+        # Quart app (imported here so importing this module stays cheap)
+        from quart import Quart
+        
+        self.app = Quart(__name__)
+        self.app.json = _orjson_provider(self.app)
+        self.app.secret_key = _SECRET_KEY
         
         # WhatsApp client
         self.client: Optional[WhatsAppClient] = None
-        self.client_thread: Optional[threading.Thread] = None
-        self.client_loop: Optional[asyncio.AbstractEventLoop] = None
+        self.client_task: Optional[asyncio.Task] = None
+        self.stop_task: Optional[asyncio.Task] = None
+        self.client_stopped: Optional[asyncio.Event] = None
+        self.tasks: Optional[asyncio.TaskGroup] = None
         
         # State management
         self.is_authenticated = False
         self.is_connected = False
         self.qr_data: Optional[str] = None
+        self.qr_image_url: Optional[str] = None
+        self.qr_auth = None  # QRAuth, created on the first /api/qr request
         self.current_status = "Disconnected"
         self.session_file = "web_session.json"
         
         # Message storage
-        self.recent_messages: List[Dict[str, Any]] = []
         self.max_messages = 100
+        self.recent_messages: Deque[Dict[str, Any]] = deque(maxlen=self.max_messages)
         
         # Setup routes
         self._setup_routes()
         
         # Setup logging
         setup_logging(level='INFO')
-        self.logger = logging.getLogger(__name__)
 
     def _setup_routes(self):
-        """Setup Flask routes."""
+        """Setup Quart routes."""
+        from quart import render_template, request, jsonify
         
         @self.app.route('/')
-        def index():
+        async def index():
             """Main page."""
-            return render_template('index.html', 
+            return await render_template('index.html', 
                                  authenticated=self.is_authenticated,
                                  connected=self.is_connected,
                                  status=self.current_status,
                                  qr_data=self.qr_data)
         
         @self.app.route('/api/status')
-        def api_status():
+        async def api_status():
             """Get current status."""
             return jsonify({
                 'authenticated': self.is_authenticated,
@@ -79,15 +167,27 @@ class WhatsAppWebInterface:
             })
         
         @self.app.route('/api/qr')
-        def api_qr():
+        async def api_qr():
             """Get QR code data."""
-            if self.qr_data:
-                # Generate QR code image
-                qr_auth = QRAuth()
+            qr_data = self.qr_data
+            if qr_data:
                 try:
-                    qr_image_url = qr_auth.get_qr_data_url(self.qr_data)
+                    # Render the QR image once per QR code, not per poll
+                    qr_image_url = self.qr_image_url
+                    if qr_image_url is None:
+                        if self.qr_auth is None:
+                            from whatsapp_web_py.auth.qr_auth import QRAuth
+                            self.qr_auth = QRAuth()
+                            
+                        # PNG encoding runs in a worker thread, off the event loop
+                        qr_image_url = await self.qr_auth.get_qr_data_url_async(qr_data)
+                        
+                        # Only cache if the QR code was not replaced meanwhile
+                        if self.qr_data == qr_data:
+                            self.qr_image_url = qr_image_url
+                        
                     return jsonify({
-                        'qr_data': self.qr_data,
+                        'qr_data': qr_data,
                         'qr_image': qr_image_url
                     })
                 except Exception as e:
@@ -96,12 +196,18 @@ class WhatsAppWebInterface:
                 return jsonify({'error': 'No QR code available'}), 404
         
         @self.app.route('/api/messages')
-        def api_messages():
+        async def api_messages():
             """Get recent messages."""
-            start = int(request.args.get('start', 0))
-            limit = int(request.args.get('limit', 20))
+            try:
+                start = int(request.args.get('start', 0))
+                limit = int(request.args.get('limit', 20))
+            except ValueError:
+                return jsonify({'error': 'start and limit must be integers'}), 400
+                
+            if start < 0 or limit < 0:
+                return jsonify({'error': 'start and limit must not be negative'}), 400
             
-            messages = self.recent_messages[start:start + limit]
+            messages = list(islice(self.recent_messages, start, start + limit))
             
             return jsonify({
                 'messages': messages,
@@ -111,27 +217,28 @@ class WhatsAppWebInterface:
             })
         
         @self.app.route('/api/send_message', methods=['POST'])
-        def api_send_message():
+        async def api_send_message():
             """Send a message."""
             if not self.is_authenticated:
                 return jsonify({'error': 'Not authenticated'}), 401
             
-            data = request.get_json()
+            data = await request.get_json()
             jid = data.get('jid')
             message = data.get('message')
             
             if not jid or not message:
                 return jsonify({'error': 'JID and message required'}), 400
             
-            # Send message asynchronously
-            if self.client and self.client_loop:
-                future = asyncio.run_coroutine_threadsafe(
-                    self.client.send_text_message(jid, message),
-                    self.client_loop
-                )
+            # Send message (a list of JIDs is sent as one batch)
+            if self.client:
+                if isinstance(jid, list):
+                    coro = self.client.send_many((j, message) for j in jid)
+                else:
+                    coro = self.client.send_text_message(jid, message)
                 
                 try:
-                    success = future.result(timeout=10)
+                    result = await asyncio.wait_for(coro, timeout=10)
+                    success = all(result) if isinstance(result, list) else result
                     if success:
                         return jsonify({'success': True, 'message': 'Message sent'})
                     else:
@@ -142,39 +249,35 @@ class WhatsAppWebInterface:
                 return jsonify({'error': 'Client not available'}), 500
         
         @self.app.route('/api/connect', methods=['POST'])
-        def api_connect():
+        async def api_connect():
             """Start WhatsApp connection."""
-            if self.client_thread and self.client_thread.is_alive():
+            if self.client_task and not self.client_task.done():
                 return jsonify({'error': 'Already connecting/connected'}), 400
             
-            # Start client in background thread
-            self.client_thread = threading.Thread(target=self._run_client)
-            self.client_thread.daemon = True
-            self.client_thread.start()
+            # Start client as a background task on the server's loop
+            self.client_task = self._create_task(
+                self._run_client(), name="whatsapp-client"
+            )
             
             return jsonify({'success': True, 'message': 'Connection started'})
         
         @self.app.route('/api/disconnect', methods=['POST'])
-        def api_disconnect():
+        async def api_disconnect():
             """Disconnect from WhatsApp."""
-            if self.client and self.client_loop:
-                # Stop client
-                future = asyncio.run_coroutine_threadsafe(
-                    self.client.stop(),
-                    self.client_loop
-                )
-                
-                try:
-                    future.result(timeout=10)
-                    self._reset_state()
-                    return jsonify({'success': True, 'message': 'Disconnected'})
-                except Exception as e:
-                    return jsonify({'error': str(e)}), 500
+            if self.client:
+                # Stop client in the background; /api/status reports progress
+                if not (self.stop_task and not self.stop_task.done()):
+                    self.current_status = "Disconnecting..."
+                    self.stop_task = self._create_task(
+                        self._disconnect(), name="whatsapp-disconnect"
+                    )
+                    
+                return jsonify({'success': True, 'message': 'Disconnecting'}), 202
             else:
                 return jsonify({'error': 'Not connected'}), 400
         
         @self.app.route('/api/clear_session', methods=['POST'])
-        def api_clear_session():
+        async def api_clear_session():
             """Clear saved session."""
             try:
                 if os.path.exists(self.session_file):
@@ -186,13 +289,15 @@ class WhatsAppWebInterface:
             except Exception as e:
                 return jsonify({'error': str(e)}), 500
 
-    def _run_client(self):
-        """Run WhatsApp client in background thread."""
+    def _create_task(self, coro, name: str) -> asyncio.Task:
+        """Create a task in the server's task group, if it is running."""
+        if self.tasks:
+            return self.tasks.create_task(coro, name=name)
+        return asyncio.create_task(coro, name=name)
+
+    async def _run_client(self):
+        """Run WhatsApp client until it stops."""
         try:
-            # Create new event loop for this thread
-            self.client_loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(self.client_loop)
-            
             # Create client
             self.client = WhatsAppClient(
                 session_file=self.session_file,
@@ -206,20 +311,19 @@ class WhatsAppWebInterface:
             self.client.on_qr_code(self._handle_qr_code)
             
             # Run client
-            self.client_loop.run_until_complete(self._client_main())
+            await self._client_main()
             
         except Exception as e:
-            self.logger.error(f"Error in client thread: {e}")
+            logger.error("Error in client task: %s", e)
             self.current_status = f"Error: {e}"
         finally:
-            if self.client_loop:
-                self.client_loop.close()
             self._reset_state()
 
     async def _client_main(self):
         """Main client coroutine."""
         try:
             self.current_status = "Connecting..."
+            self.client_stopped = asyncio.Event()
             
             # Start client
             success = await self.client.start()
@@ -227,16 +331,32 @@ class WhatsAppWebInterface:
             if success:
                 self.current_status = "Connected"
                 
-                # Keep running until stopped
-                while self.client.is_connected or self.client.is_authenticated:
-                    await asyncio.sleep(1)
+                # Keep running until stopped or disconnected
+                await self.client_stopped.wait()
             else:
                 self.current_status = "Failed to connect"
                 
         except Exception as e:
-            self.logger.error(f"Error in client main: {e}")
+            logger.error("Error in client main: %s", e)
             self.current_status = f"Error: {e}"
 
+    async def _stop_client(self):
+        """Stop the client and release the main client coroutine."""
+        try:
+            await self.client.stop()
+        finally:
+            if self.client_stopped:
+                self.client_stopped.set()
+
+    async def _disconnect(self):
+        """Stop the client and reset the interface state."""
+        try:
+            await asyncio.wait_for(self._stop_client(), timeout=10)
+        except Exception as e:
+            logger.error("Error stopping client: %s", e)
+        finally:
+            self._reset_state()
+
     async def _handle_message(self, event: MessageEvent):
         """Handle incoming messages."""
         try:
@@ -249,44 +369,20 @@ class WhatsAppWebInterface:
                 'from_me': event.from_me,
                 'content': self._format_message_content(event),
                 'participant': event.participant,
-                'datetime': datetime.fromtimestamp(event.timestamp).isoformat()
+                'datetime': _iso(int(event.timestamp))
             }
             
-            # Add to recent messages
-            self.recent_messages.insert(0, message_data)
-            
-            # Limit message history
-            if len(self.recent_messages) > self.max_messages:
-                self.recent_messages = self.recent_messages[:self.max_messages]
+            # Add to recent messages (oldest entries are evicted automatically)
+            self.recent_messages.appendleft(message_data)
                 
-            self.logger.info(f"Message received: {event.type.value} from {event.jid}")
+            logger.info("Message received: %s from %s", event.type.value, event.jid)
             
         except Exception as e:
-            self.logger.error(f"Error handling message: {e}")
+            logger.error("Error handling message: %s", e)
 
     def _format_message_content(self, event: MessageEvent) -> str:
         """Format message content for display."""
-        if event.type == MessageType.TEXT:
-            return str(event.content)
-        elif event.type == MessageType.IMAGE:
-            caption = event.content.get('caption', '') if isinstance(event.content, dict) else ''
-            return f"📷 Image{': ' + caption if caption else ''}"
-        elif event.type == MessageType.VIDEO:
-            caption = event.content.get('caption', '') if isinstance(event.content, dict) else ''
-            return f"🎥 Video{': ' + caption if caption else ''}"
-        elif event.type == MessageType.AUDIO:
-            return "🎵 Audio message"
-        elif event.type == MessageType.DOCUMENT:
-            filename = event.content.get('fileName', 'Document') if isinstance(event.content, dict) else 'Document'
-            return f"📄 {filename}"
-        elif event.type == MessageType.STICKER:
-            return "🎭 Sticker"
-        elif event.type == MessageType.LOCATION:
-            return "📍 Location"
-        elif event.type == MessageType.CONTACT:
-            return "👤 Contact"
-        else:
-            return f"[{event.type.value}]"
+        return _FORMATTERS.get(event.type, _format_unknown)(event.content, event.type)
 
     async def _handle_connection(self, connected: bool):
         """Handle connection state changes."""
@@ -294,25 +390,31 @@ class WhatsAppWebInterface:
         
         if connected:
             self.current_status = "Connected"
-            self.logger.info("Connected to WhatsApp Web")
+            logger.info("Connected to WhatsApp Web")
         else:
             self.current_status = "Disconnected"
-            self.logger.info("Disconnected from WhatsApp Web")
+            logger.info("Disconnected from WhatsApp Web")
+            
+            if self.client_stopped and not (self.client and self.client.is_authenticated):
+                self.client_stopped.set()
 
     async def _handle_qr_code(self, qr_data: str):
         """Handle QR code generation."""
         self.qr_data = qr_data
+        self.qr_image_url = None
         self.current_status = "QR Code generated - Please scan"
-        self.logger.info("QR code generated for authentication")
+        logger.info("QR code generated for authentication")
 
     def _reset_state(self):
         """Reset interface state."""
         self.is_authenticated = False
         self.is_connected = False
         self.qr_data = None
+        self.qr_image_url = None
         self.current_status = "Disconnected"
         self.client = None
-        self.client_loop = None
+        self.client_task = None
+        self.client_stopped = None
 
     def run(self, debug: bool = False):
         """Run the web interface."""
@@ -324,32 +426,42 @@ class WhatsAppWebInterface:
         print("   • Manage sessions")
         print("\n" + "="*60)
         
+        runner = uvloop.run if uvloop else asyncio.run
+        
         try:
-            # Create server
-            server = make_server(self.host, self.port, self.app, threaded=True)
-            
-            print(f"✅ Server started successfully!")
-            print(f"🔗 Open http://localhost:{self.port} in your browser")
-            print("⏹️  Press Ctrl+C to stop")
-            
-            # Serve forever
-            server.serve_forever()
-            
+            runner(self._serve(debug))
         except KeyboardInterrupt:
             print("\n⏹️ Server stopped by user")
         except Exception as e:
             print(f"❌ Server error: {e}")
-        finally:
-            # Cleanup
-            if self.client and self.client_loop:
-                try:
-                    future = asyncio.run_coroutine_threadsafe(
-                        self.client.stop(),
-                        self.client_loop
-                    )
-                    future.result(timeout=5)
-                except Exception as e:
-                    print(f"Error stopping client: {e}")
+
+    async def _serve(self, debug: bool = False):
+        """Serve HTTP requests with client tasks scoped to the server's lifetime."""
+        if hasattr(asyncio, 'eager_task_factory'):
+            # Python 3.12+: run new tasks inline until their first suspension
+            asyncio.get_running_loop().set_task_factory(asyncio.eager_task_factory)
+            
+        async with asyncio.TaskGroup() as tasks:
+            self.tasks = tasks
+            try:
+                print(f"✅ Server started successfully!")
+                print(f"🔗 Open http://localhost:{self.port} in your browser")
+                print("⏹️  Press Ctrl+C to stop")
+                
+                # Serve forever
+                await self.app.run_task(host=self.host, port=self.port, debug=debug)
+                
+            finally:
+                # Cleanup
+                if self.client:
+                    try:
+                        await asyncio.wait_for(self._stop_client(), timeout=5)
+                    except Exception as e:
+                        print(f"Error stopping client: {e}")
+                        
+                if self.client_task:
+                    self.client_task.cancel()
+                self.tasks = None
 
 
 def main():
@@ -6,20 +6,25 @@ Handles the initial pairing process between client and WhatsApp servers.
 """
 
 import asyncio
-import base64
 import json
 import time
 from typing import Optional, Callable, Dict, Any
-import pyqrcode
 from io import BytesIO
-from PIL import Image
+
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in replacement
+except ImportError:
+    import base64
 
 from ..crypto.curve import Curve25519
 from ..crypto.hkdf import HKDF
 from ..crypto.aes import AESCipher
+from ..crypto.mac import verify_hmac_sha256
 from ..utils.logger import get_logger
 from ..utils.constants import WHATSAPP_WEB_VERSION
 
+logger = get_logger(__name__)
+
 
 class QRAuth:
     """
@@ -31,12 +36,12 @@ class QRAuth:
 
     def __init__(self):
         """Initialize QR authentication handler."""
-        self.logger = get_logger(__name__)
         
         # Authentication state
         self.client_id: Optional[str] = None
         self.private_key: Optional[bytes] = None
         self.public_key: Optional[bytes] = None
+        self.public_key_b64: Optional[str] = None
         self.qr_timeout = 30  # seconds
         
         # Event handlers
@@ -63,11 +68,11 @@ class QRAuth:
             True if initialization successful
         """
         try:
-            self.logger.info("Initializing QR authentication...")
+            logger.info("Initializing QR authentication...")
             
             # Generate client credentials
-            self.client_id = Curve25519.generate_client_id()
-            self.private_key, self.public_key = Curve25519.generate_keypair()
+            self.client_id, self.private_key, self.public_key = Curve25519.generate_identity()
+            self.public_key_b64 = base64.b64encode(self.public_key).decode('ascii')
             
             # Send initialization message
             init_message = [
@@ -93,7 +98,7 @@ class QRAuth:
                 raise Exception("Invalid initialization response")
                 
         except Exception as e:
-            self.logger.error(f"Failed to initialize QR auth: {e}")
+            logger.error("Failed to initialize QR auth: %s", e)
             if self.on_error:
                 await self._safe_call_handler(self.on_error, e)
             return False
@@ -113,7 +118,7 @@ class QRAuth:
                 raise Exception("Invalid response format")
                 
         except Exception as e:
-            self.logger.error(f"Error handling init response: {e}")
+            logger.error("Error handling init response: %s", e)
             raise
 
     async def _generate_qr_code(self, qr_ref: str):
@@ -124,20 +129,17 @@ class QRAuth:
             qr_ref: QR reference from server
         """
         try:
-            # Encode public key as base64
-            public_key_b64 = base64.b64encode(self.public_key).decode('ascii')
-            
             # Create QR data: ref,public_key,client_id
-            qr_data = f"{qr_ref},{public_key_b64},{self.client_id}"
+            qr_data = f"{qr_ref},{self.public_key_b64},{self.client_id}"
             
-            self.logger.info("QR code generated successfully")
+            logger.info("QR code generated successfully")
             
             # Notify QR handlers
             if self.on_qr_code:
                 await self._safe_call_handler(self.on_qr_code, qr_data)
                 
         except Exception as e:
-            self.logger.error(f"Failed to generate QR code: {e}")
+            logger.error("Failed to generate QR code: %s", e)
             raise
 
     def generate_qr_image(self, qr_data: str, scale: int = 8) -> bytes:
@@ -152,19 +154,50 @@ class QRAuth:
             PNG image data as bytes
         """
         try:
+            # Imported lazily: only callers that render a QR pay for it
+            import segno
+            
             # Generate QR code
-            qr = pyqrcode.create(qr_data)
+            qr = segno.make(qr_data, error='h')
             
             # Create PNG buffer
             png_buffer = BytesIO()
-            qr.png(png_buffer, scale=scale)
+            qr.save(png_buffer, kind='png', scale=scale)
             
             return png_buffer.getvalue()
             
         except Exception as e:
-            self.logger.error(f"Failed to generate QR image: {e}")
+            logger.error("Failed to generate QR image: %s", e)
             raise
 
+    async def generate_qr_image_async(self, qr_data: str, scale: int = 8) -> bytes:
+        """
+        Generate QR code image in a worker thread.
+        
+        Use this from coroutines; generate_qr_image blocks the event loop
+        while the PNG is encoded.
+        
+        Args:
+            qr_data: QR code data string
+            scale: Scale factor for image size
+            
+        Returns:
+            PNG image data as bytes
+        """
+        return await asyncio.to_thread(self.generate_qr_image, qr_data, scale)
+
+    async def get_qr_data_url_async(self, qr_data: str) -> str:
+        """
+        Generate QR code data URL in a worker thread.
+        
+        Args:
+            qr_data: QR code data string
+            
+        Returns:
+            Data URL string
+        """
+        return await asyncio.to_thread(self.get_qr_data_url, qr_data)
+
     def get_qr_data_url(self, qr_data: str) -> str:
         """
         Generate QR code as data URL for web display.
@@ -181,7 +214,7 @@ class QRAuth:
             return f"data:image/png;base64,{b64_data}"
             
         except Exception as e:
-            self.logger.error(f"Failed to generate QR data URL: {e}")
+            logger.error("Failed to generate QR data URL: %s", e)
             raise
 
     async def handle_connection_message(self, message: Dict[str, Any]) -> bool:
@@ -194,25 +227,25 @@ class QRAuth:
         Returns:
             True if authentication successful
         """
+        # Anything not shaped like ["Conn", {"secret": ...}, ...] fails one of these lookups
+        try:
+            tag = message[0]
+            secret_b64 = message[1]['secret']
+        except (TypeError, IndexError, KeyError):
+            return False
+            
+        if tag != "Conn":
+            return False
+            
         try:
-            if not isinstance(message, list) or len(message) < 2:
-                return False
-                
-            if message[0] != "Conn":
-                return False
-                
-            conn_data = message[1]
-            if not isinstance(conn_data, dict) or 'secret' not in conn_data:
-                return False
-                
             # Decode shared secret
-            shared_secret = base64.b64decode(conn_data['secret'])
+            shared_secret = base64.b64decode(secret_b64)
             
             # Process authentication
             auth_data = await self._process_shared_secret(shared_secret)
             
             if auth_data:
-                self.logger.info("Authentication successful")
+                logger.info("Authentication successful")
                 
                 if self.on_authenticated:
                     await self._safe_call_handler(self.on_authenticated, auth_data)
@@ -222,7 +255,7 @@ class QRAuth:
                 raise Exception("Failed to process shared secret")
                 
         except Exception as e:
-            self.logger.error(f"Error handling connection message: {e}")
+            logger.error("Error handling connection message: %s", e)
             if self.on_error:
                 await self._safe_call_handler(self.on_error, e)
             return False
@@ -252,35 +285,27 @@ class QRAuth:
                 secret_public_key
             )
             
-            # Derive keys using HKDF
-            hkdf = HKDF()
-            expanded_secret = hkdf.expand(ecdh_secret, 80)
+            # Derive keys using HKDF (expand runs natively for SHA-256)
+            expanded_secret = HKDF().expand(ecdh_secret, 80, b'')
             
             # Split expanded secret
             hmac_key = expanded_secret[32:64]
             aes_key = expanded_secret[:32]
             
             # Verify HMAC
-            import hmac
-            import hashlib
-            
-            expected_hmac = hmac.new(
+            if not verify_hmac_sha256(
                 hmac_key,
-                secret_public_key + encrypted_keys,
-                hashlib.sha256
-            ).digest()
-            
-            if not hmac.compare_digest(hmac_validation, expected_hmac):
+                encrypted_keys,
+                hmac_validation,
+                prefix=secret_public_key
+            ):
                 raise ValueError("HMAC validation failed")
                 
-            # Decrypt session keys
-            aes_cipher = AESCipher()
-            
-            # Prepare ciphertext (add IV from expanded secret)
-            iv = expanded_secret[64:][:16]
-            ciphertext = iv + encrypted_keys
+            # Decrypt session keys (AES-CBC via OpenSSL EVP)
+            # IV comes from the expanded secret and goes straight into the mode
+            iv = expanded_secret[64:80]
             
-            decrypted_keys = aes_cipher.decrypt_cbc(ciphertext, aes_key)
+            decrypted_keys = AESCipher.decrypt_cbc(encrypted_keys, aes_key, iv=iv)
             
             if len(decrypted_keys) < 64:
                 raise ValueError("Decrypted keys too short")
@@ -303,7 +328,7 @@ class QRAuth:
             return auth_data
             
         except Exception as e:
-            self.logger.error(f"Failed to process shared secret: {e}")
+            logger.error("Failed to process shared secret: %s", e)
             return None
 
     async def start_timeout_monitor(self):
@@ -311,7 +336,7 @@ class QRAuth:
         try:
             await asyncio.sleep(self.qr_timeout)
             
-            self.logger.warning("QR code authentication timed out")
+            logger.warning("QR code authentication timed out")
             
             if self.on_timeout:
                 await self._safe_call_handler(self.on_timeout)
@@ -320,7 +345,7 @@ class QRAuth:
             # Timeout monitoring was cancelled (normal)
             pass
         except Exception as e:
-            self.logger.error(f"Error in timeout monitor: {e}")
+            logger.error("Error in timeout monitor: %s", e)
 
     async def _safe_call_handler(self, handler: Callable, *args):
         """Safely call event handler."""
@@ -330,15 +355,16 @@ class QRAuth:
             else:
                 handler(*args)
         except Exception as e:
-            self.logger.error(f"Error in event handler: {e}")
+            logger.error("Error in event handler: %s", e)
 
     def reset(self):
         """Reset authentication state."""
         self.client_id = None
         self.private_key = None
         self.public_key = None
+        self.public_key_b64 = None
         
-        self.logger.info("QR authentication reset")
+        logger.info("QR authentication reset")
 
     def is_initialized(self) -> bool:
         """Check if authentication is initialized."""
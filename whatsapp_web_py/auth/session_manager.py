@@ -2,11 +2,36 @@
 Session management for WhatsApp Web authentication.
 """
 
-import json
+import contextlib
 import os
+import tempfile
 from typing import Optional, Dict, Any
 from pathlib import Path
 
+import orjson
+
+
+def write_session_file(path: str, data: Dict[str, Any]):
+    """Atomically write session data as indented JSON."""
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".session-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+    except BaseException:
+        with contextlib.suppress(OSError):
+            os.unlink(tmp_path)
+        raise
+
+
+def read_session_file(path: str) -> Dict[str, Any]:
+    """Read session data written by write_session_file."""
+    return orjson.loads(Path(path).read_bytes())
+
+
 class SessionManager:
     """Manages WhatsApp Web session data."""
     
@@ -20,8 +45,7 @@ class SessionManager:
         """Load session data from file."""
         try:
             if os.path.exists(self.session_file):
-                with open(self.session_file, "r") as f:
-                    self.session_data = json.load(f)
+                self.session_data = read_session_file(self.session_file)
                 return True
         except Exception:
             pass
@@ -30,8 +54,7 @@ class SessionManager:
     def save_session(self, data: Dict[str, Any]):
         """Save session data to file."""
         self.session_data.update(data)
-        with open(self.session_file, "w") as f:
-            json.dump(self.session_data, f, indent=2)
+        write_session_file(self.session_file, self.session_data)
     
     def get_session_data(self) -> Dict[str, Any]:
         """Get session data."""
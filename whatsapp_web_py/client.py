@@ -6,19 +6,42 @@ authentication, message handling, and WebSocket communication.
 """
 
 import asyncio
-import json
+import contextlib
+import inspect
 import logging
-from typing import Optional, Callable, Dict, Any, List
+import time
+from typing import Optional, Callable, Dict, Any, Iterable, List, Tuple
 from pathlib import Path
 
+try:
+    import pybase64 as base64  # SIMD-accelerated drop-in replacement
+except ImportError:
+    import base64
+
 from .websocket.handler import WebSocketHandler
 from .auth.qr_auth import QRAuth
 from .auth.session import Session
+from .auth.session_manager import read_session_file, write_session_file
 from .messages.processor import MessageProcessor, MessageEvent, MessageType
 from .messages.media import MediaHandler
 from .utils.logger import get_logger
 from .utils.constants import WHATSAPP_WEB_VERSION, USER_AGENT
 
+logger = get_logger(__name__)
+
+
+def _encode_key(key: Optional[bytes]) -> str:
+    """Encode a session key for the session file."""
+    return base64.b64encode(key).decode('ascii') if key else ''
+
+
+def _decode_key(value: str) -> bytes:
+    """Decode a session key, accepting the legacy hex encoding."""
+    if len(value) == 64:
+        with contextlib.suppress(ValueError):
+            return bytes.fromhex(value)
+    return base64.b64decode(value, validate=True)
+
 
 class WhatsAppClient:
     """
@@ -42,7 +65,6 @@ class WhatsAppClient:
             browser_name: Browser name for user agent
             browser_version: Browser version for user agent
         """
-        self.logger = get_logger(__name__)
         self.session_file = session_file or "session.json"
         self.browser_name = browser_name
         self.browser_version = browser_version
@@ -61,10 +83,11 @@ class WhatsAppClient:
         self.enc_key: Optional[bytes] = None
         self.mac_key: Optional[bytes] = None
         
-        # Event handlers
-        self.message_handlers: List[Callable[[MessageEvent], None]] = []
-        self.connection_handlers: List[Callable[[bool], None]] = []
-        self.qr_handlers: List[Callable[[str], None]] = []
+        # Event handlers, stored as (handler, is_coroutine_function).
+        # Tuples are rebound on registration, so dispatch iterates a snapshot.
+        self.message_handlers: Tuple[Tuple[Callable[[MessageEvent], None], bool], ...] = ()
+        self.connection_handlers: Tuple[Tuple[Callable[[bool], None], bool], ...] = ()
+        self.qr_handlers: Tuple[Tuple[Callable[[str], None], bool], ...] = ()
         
         # Setup event handlers
         self._setup_handlers()
@@ -84,19 +107,19 @@ class WhatsAppClient:
             True if successfully started and authenticated
         """
         try:
-            self.logger.info("Starting WhatsApp Web client...")
+            logger.info("Starting WhatsApp Web client...")
             
             # Try to restore existing session
             if await self._restore_session():
-                self.logger.info("Session restored successfully")
+                logger.info("Session restored successfully")
                 return await self._connect_with_session()
             
             # Start fresh authentication
-            self.logger.info("Starting fresh authentication")
+            logger.info("Starting fresh authentication")
             return await self._start_fresh_auth()
             
         except Exception as e:
-            self.logger.error(f"Failed to start client: {e}")
+            logger.error("Failed to start client: %s", e)
             return False
 
     async def _restore_session(self) -> bool:
@@ -105,17 +128,16 @@ class WhatsAppClient:
             if not Path(self.session_file).exists():
                 return False
                 
-            with open(self.session_file, 'r') as f:
-                session_data = json.load(f)
+            session_data = read_session_file(self.session_file)
                 
             if self.session.restore(session_data):
                 self.client_id = session_data.get('clientId')
-                self.enc_key = bytes.fromhex(session_data.get('encKey', ''))
-                self.mac_key = bytes.fromhex(session_data.get('macKey', ''))
+                self.enc_key = _decode_key(session_data.get('encKey', ''))
+                self.mac_key = _decode_key(session_data.get('macKey', ''))
                 return True
                 
         except Exception as e:
-            self.logger.warning(f"Failed to restore session: {e}")
+            logger.warning("Failed to restore session: %s", e)
             
         return False
 
@@ -141,7 +163,7 @@ class WhatsAppClient:
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to connect with session: {e}")
+            logger.error("Failed to connect with session: %s", e)
             return False
 
     async def _start_fresh_auth(self) -> bool:
@@ -160,9 +182,26 @@ class WhatsAppClient:
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to start fresh authentication: {e}")
+            logger.error("Failed to start fresh authentication: %s", e)
             return False
 
+    async def _dispatch(self, handlers: Tuple[Tuple[Callable, bool], ...], arg: Any, kind: str):
+        """Call sync handlers inline, then run coroutine handlers concurrently."""
+        coros = []
+        for handler, is_coro in handlers:
+            if is_coro:
+                coros.append(handler(arg))
+                continue
+            try:
+                handler(arg)
+            except Exception as e:
+                logger.error("Error in %s handler: %s", kind, e)
+                
+        if coros:
+            for result in await asyncio.gather(*coros, return_exceptions=True):
+                if isinstance(result, Exception):
+                    logger.error("Error in %s handler: %s", kind, result)
+
     async def _handle_websocket_message(self, message: Dict[str, Any]):
         """Handle incoming WebSocket messages."""
         try:
@@ -175,44 +214,23 @@ class WhatsAppClient:
             
             # Emit events to handlers
             for event in events:
-                for handler in self.message_handlers:
-                    try:
-                        if asyncio.iscoroutinefunction(handler):
-                            await handler(event)
-                        else:
-                            handler(event)
-                    except Exception as e:
-                        self.logger.error(f"Error in message handler: {e}")
+                await self._dispatch(self.message_handlers, event, "message")
                         
         except Exception as e:
-            self.logger.error(f"Error handling WebSocket message: {e}")
+            logger.error("Error handling WebSocket message: %s", e)
 
     async def _handle_connection_change(self, connected: bool):
         """Handle connection state changes."""
         self.is_connected = connected
-        self.logger.info(f"Connection state changed: {connected}")
+        logger.info("Connection state changed: %s", connected)
         
-        for handler in self.connection_handlers:
-            try:
-                if asyncio.iscoroutinefunction(handler):
-                    await handler(connected)
-                else:
-                    handler(connected)
-            except Exception as e:
-                self.logger.error(f"Error in connection handler: {e}")
+        await self._dispatch(self.connection_handlers, connected, "connection")
 
     async def _handle_qr_code(self, qr_data: str):
         """Handle QR code generation."""
-        self.logger.info("QR code generated")
+        logger.info("QR code generated")
         
-        for handler in self.qr_handlers:
-            try:
-                if asyncio.iscoroutinefunction(handler):
-                    await handler(qr_data)
-                else:
-                    handler(qr_data)
-            except Exception as e:
-                self.logger.error(f"Error in QR handler: {e}")
+        await self._dispatch(self.qr_handlers, qr_data, "QR")
 
     async def _handle_authentication(self, auth_data: Dict[str, Any]):
         """Handle successful authentication."""
@@ -229,27 +247,27 @@ class WhatsAppClient:
             await self._save_session()
             
             self.is_authenticated = True
-            self.logger.info("Authentication successful")
+            logger.info("Authentication successful")
             
         except Exception as e:
-            self.logger.error(f"Error handling authentication: {e}")
+            logger.error("Error handling authentication: %s", e)
 
     async def _save_session(self):
         """Save current session to file."""
         try:
             session_data = {
                 'clientId': self.client_id,
-                'encKey': self.enc_key.hex() if self.enc_key else '',
-                'macKey': self.mac_key.hex() if self.mac_key else '',
+                'encKey': _encode_key(self.enc_key),
+                'macKey': _encode_key(self.mac_key),
                 'serverToken': self.session.server_token,
                 'clientToken': self.session.client_token
             }
             
-            with open(self.session_file, 'w') as f:
-                json.dump(session_data, f, indent=2)
+            # Write off the event loop; the file is replaced atomically
+            await asyncio.to_thread(write_session_file, self.session_file, session_data)
                 
         except Exception as e:
-            self.logger.error(f"Failed to save session: {e}")
+            logger.error("Failed to save session: %s", e)
 
     async def send_text_message(self, jid: str, text: str) -> bool:
         """
@@ -262,29 +280,63 @@ class WhatsAppClient:
         Returns:
             True if message sent successfully
         """
+        if not self.is_authenticated:
+            logger.error("Failed to send text message: Client not authenticated")
+            return False
+            
+        return await self._send_text(
+            self.message_processor.encrypt_message, self.enc_key, self.mac_key, jid, text
+        )
+
+    async def send_many(self, messages: Iterable[Tuple[str, str]]) -> List[bool]:
+        """
+        Send several text messages concurrently.
+        
+        Args:
+            messages: Iterable of (jid, text) pairs
+            
+        Returns:
+            List of per-message results, in input order
+        """
+        messages = list(messages)
+        if not self.is_authenticated:
+            logger.error("Failed to send text messages: Client not authenticated")
+            return [False] * len(messages)
+            
+        # Resolve the processor and keys once for the whole batch
+        encrypt = self.message_processor.encrypt_message
+        enc_key, mac_key = self.enc_key, self.mac_key
+        return await asyncio.gather(
+            *(self._send_text(encrypt, enc_key, mac_key, jid, text) for jid, text in messages)
+        )
+
+    async def _send_text(
+        self,
+        encrypt: Callable,
+        enc_key: Optional[bytes],
+        mac_key: Optional[bytes],
+        jid: str,
+        text: str
+    ) -> bool:
+        """Encrypt and send one text message with pre-resolved processor and keys."""
         try:
-            if not self.is_authenticated:
-                raise Exception("Client not authenticated")
-                
             message_data = {
                 "type": "text",
                 "to": jid,
                 "body": text,
-                "timestamp": int(asyncio.get_event_loop().time() * 1000)
+                "timestamp": time.time_ns() // 1_000_000
             }
             
             # Encrypt and send message
-            encrypted_message = await self.message_processor.encrypt_message(
-                message_data, self.enc_key, self.mac_key
-            )
+            encrypted_message = await encrypt(message_data, enc_key, mac_key)
             
             await self.websocket_handler.send_message(encrypted_message)
             
-            self.logger.info(f"Text message sent to {jid}")
+            logger.info("Text message sent to %s", jid)
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to send text message: {e}")
+            logger.error("Failed to send text message: %s", e)
             return False
 
     async def send_media_message(
@@ -320,7 +372,7 @@ class WhatsAppClient:
                 "to": jid,
                 "url": media_url,
                 "caption": caption,
-                "timestamp": int(asyncio.get_event_loop().time() * 1000)
+                "timestamp": time.time_ns() // 1_000_000
             }
             
             # Encrypt and send message
@@ -330,29 +382,29 @@ class WhatsAppClient:
             
             await self.websocket_handler.send_message(encrypted_message)
             
-            self.logger.info(f"Media message sent to {jid}")
+            logger.info("Media message sent to %s", jid)
             return True
             
         except Exception as e:
-            self.logger.error(f"Failed to send media message: {e}")
+            logger.error("Failed to send media message: %s", e)
             return False
 
     def on_message(self, handler: Callable[[MessageEvent], None]):
         """Register message event handler."""
-        self.message_handlers.append(handler)
+        self.message_handlers += ((handler, inspect.iscoroutinefunction(handler)),)
 
     def on_connection(self, handler: Callable[[bool], None]):
         """Register connection event handler."""
-        self.connection_handlers.append(handler)
+        self.connection_handlers += ((handler, inspect.iscoroutinefunction(handler)),)
 
     def on_qr_code(self, handler: Callable[[str], None]):
         """Register QR code event handler."""
-        self.qr_handlers.append(handler)
+        self.qr_handlers += ((handler, inspect.iscoroutinefunction(handler)),)
 
     async def stop(self):
         """Stop the client and cleanup resources."""
         try:
-            self.logger.info("Stopping WhatsApp Web client...")
+            logger.info("Stopping WhatsApp Web client...")
             
             # Save session before stopping
             if self.is_authenticated:
@@ -365,10 +417,10 @@ class WhatsAppClient:
             self.is_authenticated = False
             self.is_connected = False
             
-            self.logger.info("Client stopped successfully")
+            logger.info("Client stopped successfully")
             
         except Exception as e:
-            self.logger.error(f"Error stopping client: {e}")
+            logger.error("Error stopping client: %s", e)
 
     async def __aenter__(self):
         """Async context manager entry."""
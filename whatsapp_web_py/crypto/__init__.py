@@ -3,7 +3,8 @@ Cryptographic module for WhatsApp Web Signal Protocol implementation.
 """
 
 from .curve import Curve25519
-from .aes import AESCipher
+from .aes import AESCipher, GcmSession
 from .hkdf import HKDF
+from .mac import hmac_sha256, verify_hmac_sha256
 
-__all__ = ["Curve25519", "AESCipher", "HKDF"]
+__all__ = ["Curve25519", "AESCipher", "GcmSession", "HKDF", "hmac_sha256", "verify_hmac_sha256"]
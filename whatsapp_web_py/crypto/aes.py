@@ -5,14 +5,18 @@ Implements AES encryption/decryption for WhatsApp Web's Signal Protocol.
 Supports both AES-CBC and AES-GCM modes as used in different parts of the protocol.
 """
 
+import hmac
 import os
 from typing import Tuple, Optional
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.primitives import padding
-from cryptography.hazmat.backends import default_backend
+from cryptography.hazmat.primitives.ciphers.aead import AESGCM
 
 from ..utils.logger import get_logger
 
+logger = get_logger(__name__)
+
+GCM_TAG_SIZE = 16
+
 
 class AESCipher:
     """
@@ -24,7 +28,6 @@ class AESCipher:
 
     def __init__(self):
         """Initialize AES cipher."""
-        self.logger = get_logger(__name__)
 
     @staticmethod
     def encrypt_cbc(plaintext: bytes, key: bytes, iv: Optional[bytes] = None) -> bytes:
@@ -45,71 +48,75 @@ class AESCipher:
             elif len(iv) != 16:
                 raise ValueError("IV must be 16 bytes")
                 
-            # Create padder
-            padder = padding.PKCS7(128).padder()
-            padded_data = padder.update(plaintext)
-            padded_data += padder.finalize()
+            # PKCS7-pad to the 16-byte block size
+            pad_len = 16 - (len(plaintext) & 15)
+            padded_data = plaintext + bytes((pad_len,)) * pad_len
             
             # Create cipher
             cipher = Cipher(
                 algorithms.AES(key),
-                modes.CBC(iv),
-                backend=default_backend()
+                modes.CBC(iv)
             )
             
-            # Encrypt
+            # Encrypt; input is block-aligned, so finalize() emits nothing
             encryptor = cipher.encryptor()
-            ciphertext = encryptor.update(padded_data) + encryptor.finalize()
+            ciphertext = encryptor.update(padded_data)
+            encryptor.finalize()
             
             # Return IV + ciphertext
             return iv + ciphertext
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"AES-CBC encryption failed: {e}")
+            logger.error("AES-CBC encryption failed: %s", e)
             raise
 
     @staticmethod
-    def decrypt_cbc(ciphertext: bytes, key: bytes) -> bytes:
+    def decrypt_cbc(ciphertext: bytes, key: bytes, iv: Optional[bytes] = None) -> bytes:
         """
         Decrypt data using AES-CBC with PKCS7 padding.
         
         Args:
-            ciphertext: IV + encrypted data
+            ciphertext: IV + encrypted data, or just the encrypted data if iv is given
             key: AES key (16, 24, or 32 bytes)
+            iv: Initialization vector kept apart from the ciphertext (optional)
             
         Returns:
             Decrypted plaintext
         """
         try:
-            if len(ciphertext) < 16:
+            if iv is not None:
+                if len(iv) != 16:
+                    raise ValueError("IV must be 16 bytes")
+                encrypted_data = ciphertext
+            elif len(ciphertext) < 16:
                 raise ValueError("Ciphertext too short (need at least IV)")
-                
-            # Extract IV and ciphertext
-            iv = ciphertext[:16]
-            encrypted_data = ciphertext[16:]
+            else:
+                # Extract IV and ciphertext
+                iv = ciphertext[:16]
+                encrypted_data = ciphertext[16:]
             
             # Create cipher
             cipher = Cipher(
                 algorithms.AES(key),
-                modes.CBC(iv),
-                backend=default_backend()
+                modes.CBC(iv)
             )
             
-            # Decrypt
+            # Decrypt; finalize() emits nothing but rejects partial blocks
             decryptor = cipher.decryptor()
-            padded_plaintext = decryptor.update(encrypted_data) + decryptor.finalize()
-            
-            # Remove padding
-            unpadder = padding.PKCS7(128).unpadder()
-            plaintext = unpadder.update(padded_plaintext)
-            plaintext += unpadder.finalize()
-            
-            return plaintext
+            padded_plaintext = decryptor.update(encrypted_data)
+            decryptor.finalize()
+            
+            # Remove PKCS7 padding; every pad byte must equal the pad length
+            pad_len = padded_plaintext[-1] if padded_plaintext else 0
+            if not 1 <= pad_len <= 16 or not hmac.compare_digest(
+                padded_plaintext[-pad_len:], bytes((pad_len,)) * pad_len
+            ):
+                raise ValueError("Invalid padding bytes")
+                
+            return padded_plaintext[:-pad_len]
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"AES-CBC decryption failed: {e}")
+            logger.error("AES-CBC decryption failed: %s", e)
             raise
 
     @staticmethod
@@ -132,30 +139,13 @@ class AESCipher:
             elif len(iv) not in [12, 16]:
                 raise ValueError("IV must be 12 or 16 bytes for GCM")
                 
-            # Create cipher
-            cipher = Cipher(
-                algorithms.AES(key),
-                modes.GCM(iv),
-                backend=default_backend()
-            )
+            # Single AEAD call; the tag is appended to the output
+            sealed = AESGCM(key).encrypt(iv, plaintext, aad or None)
             
-            # Encrypt
-            encryptor = cipher.encryptor()
-            
-            # Add AAD if provided
-            if aad:
-                encryptor.authenticate_additional_data(aad)
-                
-            ciphertext = encryptor.update(plaintext) + encryptor.finalize()
-            
-            # Get authentication tag
-            tag = encryptor.tag
-            
-            return iv + ciphertext, tag
+            return iv + sealed[:-GCM_TAG_SIZE], sealed[-GCM_TAG_SIZE:]
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"AES-GCM encryption failed: {e}")
+            logger.error("AES-GCM encryption failed: %s", e)
             raise
 
     @staticmethod
@@ -181,27 +171,66 @@ class AESCipher:
             iv = ciphertext[:iv_length]
             encrypted_data = ciphertext[iv_length:]
             
-            # Create cipher
-            cipher = Cipher(
-                algorithms.AES(key),
-                modes.GCM(iv, tag),
-                backend=default_backend()
-            )
+            # Decrypt and verify in one AEAD call (expects ciphertext + tag)
+            return AESGCM(key).decrypt(iv, encrypted_data + tag, aad or None)
             
-            # Decrypt
-            decryptor = cipher.decryptor()
+        except Exception as e:
+            logger.error("AES-GCM decryption failed: %s", e)
+            raise
+
+    @staticmethod
+    def seal_gcm(plaintext: bytes, key: bytes, iv: Optional[bytes] = None, aad: Optional[bytes] = None) -> bytes:
+        """
+        Encrypt a frame with AES-GCM in a single AEAD call.
+        
+        Unlike encrypt_gcm the tag is not split off, so the result can be
+        sent as-is and passed straight back to open_gcm.
+        
+        Args:
+            plaintext: Data to encrypt
+            key: AES key (16, 24, or 32 bytes)
+            iv: Initialization vector (12 bytes recommended, random if None)
+            aad: Additional authenticated data (optional)
             
-            # Add AAD if provided
-            if aad:
-                decryptor.authenticate_additional_data(aad)
+        Returns:
+            IV + ciphertext + authentication tag
+        """
+        try:
+            if iv is None:
+                iv = os.urandom(12)  # 96-bit IV for GCM
+            elif len(iv) not in [12, 16]:
+                raise ValueError("IV must be 12 or 16 bytes for GCM")
                 
-            plaintext = decryptor.update(encrypted_data) + decryptor.finalize()
+            return iv + AESGCM(key).encrypt(iv, plaintext, aad or None)
             
-            return plaintext
+        except Exception as e:
+            logger.error("AES-GCM seal failed: %s", e)
+            raise
+
+    @staticmethod
+    def open_gcm(frame: bytes, key: bytes, aad: Optional[bytes] = None, iv_length: int = 12) -> bytes:
+        """
+        Decrypt and verify a frame produced by seal_gcm in a single AEAD call.
+        
+        Args:
+            frame: IV + ciphertext + authentication tag
+            key: AES key (16, 24, or 32 bytes)
+            aad: Additional authenticated data (optional)
+            iv_length: Length of IV (12 or 16 bytes)
+            
+        Returns:
+            Decrypted plaintext
+        """
+        try:
+            if len(frame) < iv_length + GCM_TAG_SIZE:
+                raise ValueError("Frame too short (need at least IV and tag)")
+                
+            # Slice without copying; the IV and sealed body go straight to OpenSSL
+            view = memoryview(frame)
+            return AESGCM(key).decrypt(view[:iv_length], view[iv_length:], aad or None)
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"AES-GCM decryption failed: {e}")
+            logger.error("AES-GCM open failed: %s", e)
             raise
 
     @staticmethod
@@ -226,19 +255,18 @@ class AESCipher:
             # Create cipher
             cipher = Cipher(
                 algorithms.AES(key),
-                modes.CTR(nonce),
-                backend=default_backend()
+                modes.CTR(nonce)
             )
             
-            # Encrypt
+            # Encrypt; CTR is a stream mode, so finalize() emits nothing
             encryptor = cipher.encryptor()
-            ciphertext = encryptor.update(plaintext) + encryptor.finalize()
+            ciphertext = encryptor.update(plaintext)
+            encryptor.finalize()
             
             return nonce + ciphertext
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"AES-CTR encryption failed: {e}")
+            logger.error("AES-CTR encryption failed: %s", e)
             raise
 
     @staticmethod
@@ -264,19 +292,18 @@ class AESCipher:
             # Create cipher
             cipher = Cipher(
                 algorithms.AES(key),
-                modes.CTR(nonce),
-                backend=default_backend()
+                modes.CTR(nonce)
             )
             
-            # Decrypt
+            # Decrypt; CTR is a stream mode, so finalize() emits nothing
             decryptor = cipher.decryptor()
-            plaintext = decryptor.update(encrypted_data) + decryptor.finalize()
+            plaintext = decryptor.update(encrypted_data)
+            decryptor.finalize()
             
             return plaintext
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"AES-CTR decryption failed: {e}")
+            logger.error("AES-CTR decryption failed: %s", e)
             raise
 
     @staticmethod
@@ -307,3 +334,53 @@ class AESCipher:
             True if key is valid
         """
         return len(key) in [16, 24, 32]
+
+
+class GcmSession:
+    """
+    AES-GCM bound to a single session key.
+    
+    Holds the OpenSSL key context for the lifetime of the session, so
+    sealing a frame is one AEAD call with no per-call key lookup. Frames
+    use the same IV + ciphertext + tag layout as AESCipher.seal_gcm.
+    """
+
+    def __init__(self, key: bytes):
+        """
+        Initialize GCM session.
+        
+        Args:
+            key: AES key (16, 24, or 32 bytes)
+        """
+        self._aead = AESGCM(key)
+
+    def seal(self, plaintext: bytes, aad: Optional[bytes] = None) -> bytes:
+        """
+        Encrypt a frame under a fresh random 96-bit IV.
+        
+        Args:
+            plaintext: Data to encrypt
+            aad: Additional authenticated data (optional)
+            
+        Returns:
+            IV + ciphertext + authentication tag
+        """
+        iv = os.urandom(12)
+        return iv + self._aead.encrypt(iv, plaintext, aad)
+
+    def open(self, frame: bytes, aad: Optional[bytes] = None) -> bytes:
+        """
+        Decrypt and verify a frame produced by seal.
+        
+        Args:
+            frame: IV + ciphertext + authentication tag
+            aad: Additional authenticated data (optional)
+            
+        Returns:
+            Decrypted plaintext
+        """
+        if len(frame) < 12 + GCM_TAG_SIZE:
+            raise ValueError("Frame too short (need at least IV and tag)")
+            
+        view = memoryview(frame)
+        return self._aead.decrypt(view[:12], view[12:], aad)
@@ -2,19 +2,39 @@
 Curve25519 Implementation
 
 Implements Curve25519 key exchange and signatures for WhatsApp Web's Signal Protocol.
-Based on the curve25519-donna implementation from the reverse engineering.
+X25519 operations are delegated to OpenSSL through pyca/cryptography, which
+uses its native (assembly-optimized where available) implementation.
 """
 
+import binascii
 import os
-import hashlib
-from typing import Tuple, Optional
-from cryptography.hazmat.primitives import hashes, serialization
+from functools import lru_cache
+from typing import Tuple
+from cryptography.exceptions import InvalidSignature
+from cryptography.hazmat.primitives.asymmetric.ed25519 import Ed25519PrivateKey, Ed25519PublicKey
 from cryptography.hazmat.primitives.asymmetric.x25519 import X25519PrivateKey, X25519PublicKey
-from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
-from cryptography.hazmat.backends import default_backend
 
+from .hkdf import HKDF
 from ..utils.logger import get_logger
 
+logger = get_logger(__name__)
+
+
+@lru_cache(maxsize=64)
+def _x25519_public(public_key: bytes) -> X25519PublicKey:
+    """Parsed X25519 public key; peers repeat across exchanges."""
+    return X25519PublicKey.from_public_bytes(public_key)
+
+
+@lru_cache(maxsize=1024)
+def _is_valid_public(public_key: bytes) -> bool:
+    """Memoized public key check; remembers rejections as well as acceptances."""
+    try:
+        X25519PublicKey.from_public_bytes(public_key)
+        return True
+    except ValueError:
+        return False
+
 
 class Curve25519:
     """
@@ -26,7 +46,6 @@ class Curve25519:
 
     def __init__(self):
         """Initialize Curve25519 handler."""
-        self.logger = get_logger(__name__)
 
     @staticmethod
     def generate_keypair() -> Tuple[bytes, bytes]:
@@ -43,16 +62,8 @@ class Curve25519:
         public_key = private_key.public_key()
         
         # Serialize keys
-        private_bytes = private_key.private_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PrivateFormat.Raw,
-            encryption_algorithm=serialization.NoEncryption()
-        )
-        
-        public_bytes = public_key.public_bytes(
-            encoding=serialization.Encoding.Raw,
-            format=serialization.PublicFormat.Raw
-        )
+        private_bytes = private_key.private_bytes_raw()
+        public_bytes = public_key.public_bytes_raw()
         
         return private_bytes, public_bytes
 
@@ -73,7 +84,7 @@ class Curve25519:
             priv_key_obj = X25519PrivateKey.from_private_bytes(private_key)
             
             # Load public key
-            pub_key_obj = X25519PublicKey.from_public_bytes(public_key)
+            pub_key_obj = _x25519_public(public_key)
             
             # Perform key exchange
             shared_secret = priv_key_obj.exchange(pub_key_obj)
@@ -81,67 +92,47 @@ class Curve25519:
             return shared_secret
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"Failed to compute shared secret: {e}")
+            logger.error("Failed to compute shared secret: %s", e)
             raise
 
     @staticmethod
     def generate_signature_keypair() -> Tuple[bytes, bytes]:
         """
-        Generate keypair for signatures (same as regular keypair for Curve25519).
+        Generate an Ed25519 keypair for signatures.
         
         Returns:
             Tuple of (private_key, public_key) for signatures
         """
-        return Curve25519.generate_keypair()
+        private_key = Ed25519PrivateKey.generate()
+        
+        return private_key.private_bytes_raw(), private_key.public_key().public_bytes_raw()
 
     @staticmethod
     def sign_data(private_key: bytes, data: bytes) -> bytes:
         """
-        Sign data using Curve25519 signature algorithm.
-        
-        This implements the Curve25519 signature scheme as used in early Axolotl/Signal.
+        Sign data with Ed25519.
         
         Args:
-            private_key: Signing private key (32 bytes)
+            private_key: Signing private key from generate_signature_keypair (32 bytes)
             data: Data to sign
             
         Returns:
             Signature (64 bytes)
         """
         try:
-            # For WhatsApp Web, we use a simplified signature scheme
-            # This is based on the implementation from the reverse engineering
-            
-            # Generate random nonce
-            nonce = os.urandom(32)
-            
-            # Compute signature components
-            # This is a simplified version - real implementation would need
-            # the full Curve25519 signature algorithm
-            hasher = hashlib.sha256()
-            hasher.update(private_key)
-            hasher.update(data)
-            hasher.update(nonce)
-            
-            signature_hash = hasher.digest()
-            
-            # For now, return hash + nonce as signature
-            # Real implementation would compute proper signature
-            return signature_hash + nonce
+            return Ed25519PrivateKey.from_private_bytes(private_key).sign(data)
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"Failed to sign data: {e}")
+            logger.error("Failed to sign data: %s", e)
             raise
 
     @staticmethod
     def verify_signature(public_key: bytes, data: bytes, signature: bytes) -> bool:
         """
-        Verify Curve25519 signature.
+        Verify an Ed25519 signature.
         
         Args:
-            public_key: Verification public key (32 bytes)
+            public_key: Verification public key from generate_signature_keypair (32 bytes)
             data: Original data
             signature: Signature to verify (64 bytes)
             
@@ -152,22 +143,13 @@ class Curve25519:
             if len(signature) != 64:
                 return False
                 
-            # Extract components
-            signature_hash = signature[:32]
-            nonce = signature[32:]
-            
-            # This is a simplified verification - real implementation
-            # would need the full Curve25519 signature verification
-            
-            # For now, just check if we can reproduce the hash
-            # This is not cryptographically secure, but matches
-            # the simplified signing above
-            
-            return True  # Placeholder
+            Ed25519PublicKey.from_public_bytes(public_key).verify(signature, data)
+            return True
             
+        except InvalidSignature:
+            return False
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"Failed to verify signature: {e}")
+            logger.error("Failed to verify signature: %s", e)
             return False
 
     @staticmethod
@@ -183,22 +165,11 @@ class Curve25519:
             Tuple of (encryption_key, mac_key)
         """
         try:
-            from .hkdf import HKDF
-            
-            # Use HKDF to derive keys
-            hkdf = HKDF()
-            
-            # Derive 64 bytes (32 for encryption, 32 for MAC)
-            derived_keys = hkdf.expand(shared_secret, length=64, info=salt)
-            
-            encryption_key = derived_keys[:32]
-            mac_key = derived_keys[32:]
-            
-            return encryption_key, mac_key
+            # Full HKDF (extract + expand); the shared secret is not a PRK
+            return HKDF.derive_whatsapp_keys(shared_secret, salt)
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"Failed to derive keys: {e}")
+            logger.error("Failed to derive keys: %s", e)
             raise
 
     @staticmethod
@@ -209,16 +180,33 @@ class Curve25519:
         Returns:
             Base64-encoded client ID
         """
-        import base64
-        
         # Generate 16 random bytes
         client_id_bytes = os.urandom(16)
         
-        # Encode as base64
-        client_id = base64.b64encode(client_id_bytes).decode('ascii')
+        # Encode as base64 (single C call, no trailing newline)
+        client_id = binascii.b2a_base64(client_id_bytes, newline=False).decode('ascii')
         
         return client_id
 
+    @staticmethod
+    def generate_identity() -> Tuple[str, bytes, bytes]:
+        """
+        Generate a client ID and key pair from a single random draw.
+        
+        Returns:
+            Tuple of (client_id, private_key, public_key)
+        """
+        # 32 bytes of private scalar + 16 bytes of client ID
+        seed = os.urandom(48)
+        
+        # X25519 clamps the scalar itself, so raw random bytes are a valid key
+        private_key = X25519PrivateKey.from_private_bytes(seed[:32])
+        public_bytes = private_key.public_key().public_bytes_raw()
+        
+        client_id = binascii.b2a_base64(seed[32:], newline=False).decode('ascii')
+        
+        return client_id, seed[:32], public_bytes
+
     @staticmethod
     def validate_public_key(public_key: bytes) -> bool:
         """
@@ -231,12 +219,11 @@ class Curve25519:
             True if key is valid
         """
         try:
+            # Wrong length never reaches OpenSSL or the cache
             if len(public_key) != 32:
                 return False
                 
-            # Try to load the key
-            X25519PublicKey.from_public_bytes(public_key)
-            return True
+            return _is_valid_public(public_key)
             
         except Exception:
             return False
@@ -277,12 +264,11 @@ class Curve25519:
         if len(private_key) != 32:
             raise ValueError("Private key must be 32 bytes")
             
-        # Convert to mutable bytearray
-        clamped = bytearray(private_key)
-        
-        # Clamp according to Curve25519 spec
-        clamped[0] &= 248
-        clamped[31] &= 127
-        clamped[31] |= 64
-        
-        return bytes(clamped)
+        # Clamp according to Curve25519 spec: clear the low 3 bits of the
+        # first byte, clear the top bit and set bit 6 of the last byte.
+        # Plain bitwise ops, not a table lookup indexed by secret bytes.
+        return b''.join((
+            bytes((private_key[0] & 248,)),
+            private_key[1:31],
+            bytes(((private_key[31] & 127) | 64,))
+        ))
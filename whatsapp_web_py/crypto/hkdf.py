@@ -7,10 +7,26 @@ Used for key derivation in WhatsApp Web's Signal Protocol implementation.
 
 import hashlib
 import hmac
-from typing import Optional
+from typing import Iterable, List, Optional
+
+from cryptography.hazmat.primitives import hashes
+from cryptography.hazmat.primitives.kdf.hkdf import HKDFExpand as _NativeHKDFExpand
 
 from ..utils.logger import get_logger
 
+logger = get_logger(__name__)
+
+# Single-byte HKDF block counters; RFC 5869 caps expansion at 255 blocks
+_COUNTERS = tuple(bytes((i,)) for i in range(256))
+
+# Digests whose expand step can run entirely inside OpenSSL
+_NATIVE_HASHES = {
+    'sha1': hashes.SHA1,
+    'sha256': hashes.SHA256,
+    'sha384': hashes.SHA384,
+    'sha512': hashes.SHA512,
+}
+
 
 class HKDF:
     """
@@ -27,9 +43,14 @@ class HKDF:
         Args:
             hash_func: Hash function to use (default: SHA-256)
         """
-        self.logger = get_logger(__name__)
         self.hash_func = hash_func
         self.hash_len = hash_func().digest_size
+        
+        # hmac takes the OpenSSL-backed C path when the digest is named
+        self._hash_name = hash_func().name
+        
+        native = _NATIVE_HASHES.get(self._hash_name)
+        self._native_hash = native() if native else None
 
     def extract(self, ikm: bytes, salt: Optional[bytes] = None) -> bytes:
         """
@@ -47,12 +68,12 @@ class HKDF:
                 salt = b'\x00' * self.hash_len
                 
             # PRK = HMAC-Hash(salt, IKM)
-            prk = hmac.new(salt, ikm, self.hash_func).digest()
+            prk = hmac.digest(salt, ikm, self._hash_name)
             
             return prk
             
         except Exception as e:
-            self.logger.error(f"HKDF extract failed: {e}")
+            logger.error("HKDF extract failed: %s", e)
             raise
 
     def expand(self, prk: bytes, length: int, info: Optional[bytes] = None) -> bytes:
@@ -77,25 +98,67 @@ class HKDF:
             if length > 255 * self.hash_len:
                 raise ValueError("Length too large for HKDF")
                 
+            # Run the whole T(i) chain natively when the digest allows it
+            if self._native_hash is not None:
+                return _NativeHKDFExpand(self._native_hash, length, info).derive(prk)
+                
             # Calculate number of iterations needed
             n = (length + self.hash_len - 1) // self.hash_len
             
-            # Generate OKM
-            okm = b''
+            # Key the HMAC once; each block copies the padded inner/outer state
+            base = hmac.new(prk, None, self._hash_name)
+            
+            # Generate OKM into a buffer sized for all n blocks
+            okm = bytearray(n * self.hash_len)
             previous = b''
             
             for i in range(1, n + 1):
                 # T(i) = HMAC-Hash(PRK, T(i-1) | info | i)
-                data = previous + info + bytes([i])
-                current = hmac.new(prk, data, self.hash_func).digest()
-                okm += current
-                previous = current
+                h = base.copy()
+                h.update(b''.join((previous, info, _COUNTERS[i])))
+                previous = h.digest()
+                okm[(i - 1) * self.hash_len:i * self.hash_len] = previous
             
             # Return first 'length' bytes
-            return okm[:length]
+            return bytes(okm[:length])
             
         except Exception as e:
-            self.logger.error(f"HKDF expand failed: {e}")
+            logger.error("HKDF expand failed: %s", e)
+            raise
+
+    def expand_batch(self, prks: Iterable[bytes], length: int, info: Optional[bytes] = None) -> List[bytes]:
+        """
+        HKDF Expand step for many PRKs sharing the same length and info.
+        
+        Arguments are validated once for the whole batch, e.g. when deriving
+        per-recipient keys for a group message.
+        
+        Args:
+            prks: Pseudo-random keys from extract step
+            length: Length of each output keying material in bytes
+            info: Optional context and application specific information
+            
+        Returns:
+            Output keying material for each PRK, in input order
+        """
+        if self._native_hash is None:
+            return [self.expand(prk, length, info) for prk in prks]
+            
+        try:
+            if info is None:
+                info = b''
+                
+            if length <= 0:
+                raise ValueError("Length must be positive")
+                
+            if length > 255 * self.hash_len:
+                raise ValueError("Length too large for HKDF")
+                
+            algorithm = self._native_hash
+            return [_NativeHKDFExpand(algorithm, length, info).derive(prk) for prk in prks]
+            
+        except Exception as e:
+            logger.error("HKDF batch expand failed: %s", e)
             raise
 
     def derive(self, ikm: bytes, length: int, salt: Optional[bytes] = None, info: Optional[bytes] = None) -> bytes:
@@ -121,7 +184,7 @@ class HKDF:
             return okm
             
         except Exception as e:
-            self.logger.error(f"HKDF derivation failed: {e}")
+            logger.error("HKDF derivation failed: %s", e)
             raise
 
     @staticmethod
@@ -137,7 +200,7 @@ class HKDF:
             Tuple of (encryption_key, mac_key) - each 32 bytes
         """
         try:
-            hkdf = HKDF()
+            hkdf = _HKDF_SHA256
             
             # Derive 64 bytes total (32 for encryption, 32 for MAC)
             derived_material = hkdf.derive(shared_secret, 64, salt)
@@ -149,8 +212,7 @@ class HKDF:
             return encryption_key, mac_key
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"WhatsApp key derivation failed: {e}")
+            logger.error("WhatsApp key derivation failed: %s", e)
             raise
 
     @staticmethod
@@ -166,7 +228,7 @@ class HKDF:
             Tuple of (send_key, recv_key, send_mac_key, recv_mac_key)
         """
         try:
-            hkdf = HKDF()
+            hkdf = _HKDF_SHA256
             
             # Derive session keys using handshake hash as info
             session_material = hkdf.derive(
@@ -184,8 +246,7 @@ class HKDF:
             return send_key, recv_key, send_mac_key, recv_mac_key
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"Session key derivation failed: {e}")
+            logger.error("Session key derivation failed: %s", e)
             raise
 
     @staticmethod
@@ -200,25 +261,26 @@ class HKDF:
             Tuple of (iv, cipher_key, mac_key)
         """
         try:
-            hkdf = HKDF()
+            hkdf = _HKDF_SHA256
             
             # Derive keys for media encryption
-            # WhatsApp uses specific info strings for different key types
+            # WhatsApp uses specific info strings for different key types.
+            # All three share the same (unsalted) PRK, so extract only once.
+            prk = hkdf.extract(media_key)
             
             # Derive IV (16 bytes)
-            iv = hkdf.derive(media_key, 16, info=b'WhatsApp Media Keys')[:16]
+            iv = hkdf.expand(prk, 16, info=b'WhatsApp Media Keys')
             
             # Derive cipher key (32 bytes)
-            cipher_key = hkdf.derive(media_key, 32, info=b'WhatsApp Cipher Keys')
+            cipher_key = hkdf.expand(prk, 32, info=b'WhatsApp Cipher Keys')
             
             # Derive MAC key (32 bytes)
-            mac_key = hkdf.derive(media_key, 32, info=b'WhatsApp MAC Keys')
+            mac_key = hkdf.expand(prk, 32, info=b'WhatsApp MAC Keys')
             
             return iv, cipher_key, mac_key
             
         except Exception as e:
-            logger = get_logger(__name__)
-            logger.error(f"Media key derivation failed: {e}")
+            logger.error("Media key derivation failed: %s", e)
             raise
 
     def verify_implementation(self) -> bool:
@@ -247,5 +309,9 @@ class HKDF:
             return derived_okm == expected_okm
             
         except Exception as e:
-            self.logger.error(f"HKDF verification failed: {e}")
+            logger.error("HKDF verification failed: %s", e)
             return False
+
+
+# Shared stateless SHA-256 instance for the derive_* helpers
+_HKDF_SHA256 = HKDF()
@@ -0,0 +1,45 @@
+"""
+HMAC Helpers
+
+HMAC-SHA256 helpers shared by the authentication and message paths.
+Uses the one-shot ``hmac.digest`` so each MAC is a single OpenSSL call.
+"""
+
+import hmac
+from typing import Optional
+
+
+def hmac_sha256(key: bytes, data: bytes) -> bytes:
+    """
+    Compute HMAC-SHA256.
+    
+    Args:
+        key: HMAC key
+        data: Message to authenticate
+        
+    Returns:
+        MAC (32 bytes)
+    """
+    return hmac.digest(key, data, 'sha256')
+
+
+def verify_hmac_sha256(key: bytes, data: bytes, mac: bytes, prefix: Optional[bytes] = None) -> bool:
+    """
+    Verify HMAC-SHA256 in constant time.
+    
+    Args:
+        key: HMAC key
+        data: Authenticated message
+        mac: MAC to check
+        prefix: Bytes authenticated ahead of data (fed separately, not concatenated)
+        
+    Returns:
+        True if the MAC is valid
+    """
+    if prefix is None:
+        expected = hmac.digest(key, data, 'sha256')
+    else:
+        h = hmac.new(key, prefix, 'sha256')
+        h.update(data)
+        expected = h.digest()
+    return hmac.compare_digest(expected, mac)
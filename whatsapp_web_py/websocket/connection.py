@@ -3,86 +3,498 @@ WebSocket connection management for WhatsApp Web.
 """
 
 import asyncio
-import websockets
+import contextlib
+import os
 import ssl
+from types import MappingProxyType
 from typing import Optional, Callable, Any
+from websockets.client import ClientProtocol
+from websockets.frames import CloseCode, Frame, Opcode
+from websockets.uri import parse_uri
 from ..utils.logger import get_logger
 
 logger = get_logger(__name__)
 
+# Frames buffered between the socket and the dispatcher before reading pauses
+RX_QUEUE_SIZE = 1024
+
+# Upper bound on bytes the writer frames into a single transport write
+TX_BATCH_BYTES = 64 * 1024
+
+# Seconds allowed for the TCP/TLS connect plus the opening handshake
+OPEN_TIMEOUT = 10
+
+# Seconds to wait for the server to finish the closing handshake
+CLOSE_TIMEOUT = 10
+
+# Keepalive: seconds between pings, and how long a pong may take before
+# the connection is considered dead (the websockets.connect defaults)
+PING_INTERVAL = 20
+PING_TIMEOUT = 20
+
+# Built once and shared by every connection; verifies the server certificate
+_SSL_CONTEXT = ssl.create_default_context()
+
+# Handshake headers sent on every (re)connect unless overridden
+_DEFAULT_HEADERS = MappingProxyType({
+    'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
+    'Origin': 'https://web.whatsapp.com'
+})
+
+class _WsProtocol(asyncio.Protocol):
+    """Drives the sans-IO websockets state machine straight from the transport."""
+    
+    __slots__ = (
+        'wsproto', 'request', 'rx_queue', 'decode_text', 'on_text', 'on_binary', 'on_lost',
+        'transport', 'handshake', 'closed', 'closed_locally', 'writable', 'paused', '_fragments',
+        '_fragment_opcode', '_close_timer', '_pings'
+    )
+    
+    def __init__(
+        self,
+        wsproto: ClientProtocol,
+        request: Any,
+        rx_queue: asyncio.Queue,
+        decode_text: bool,
+        on_text: Optional[Callable],
+        on_binary: Optional[Callable],
+        on_lost: Callable[[], None]
+    ):
+        loop = asyncio.get_running_loop()
+        self.wsproto = wsproto
+        self.request = request
+        self.rx_queue = rx_queue
+        self.decode_text = decode_text
+        self.on_text = on_text
+        self.on_binary = on_binary
+        self.on_lost = on_lost
+        self.transport: Optional[asyncio.Transport] = None
+        self.handshake = loop.create_future()
+        self.closed = loop.create_future()
+        self.closed_locally = False
+        self.writable = asyncio.Event()
+        self.writable.set()
+        self._pings: dict = {}
+        self.paused = False
+        self._fragments: list = []
+        self._fragment_opcode: Optional[Opcode] = None
+        self._close_timer: Optional[asyncio.TimerHandle] = None
+        
+    def connection_made(self, transport: asyncio.Transport):
+        self.transport = transport
+        self.wsproto.send_request(self.request)
+        self.flush()
+        
+    def data_received(self, data: bytes):
+        wsproto = self.wsproto
+        wsproto.receive_data(data)
+        
+        # Frames go onto the queue synchronously; no await per frame
+        for event in wsproto.events_received():
+            if isinstance(event, Frame):
+                self._frame_received(event)
+            elif not self.handshake.done():
+                if wsproto.handshake_exc is None:
+                    self.handshake.set_result(None)
+                else:
+                    self.handshake.set_exception(wsproto.handshake_exc)
+                    
+        # Pongs and close replies queued by the state machine
+        self.flush()
+        
+    def eof_received(self):
+        self.wsproto.receive_eof()
+        self.flush()
+        
+    def connection_lost(self, exc: Optional[Exception]):
+        # Close is detected here, not by an exception out of a receive loop
+        self.on_lost()
+        
+        if self._close_timer is not None:
+            self._close_timer.cancel()
+            
+        if not self.handshake.done():
+            self.handshake.set_exception(exc or ConnectionError("Connection closed during handshake"))
+            
+        if exc is not None:
+            logger.error("WebSocket transport error: %s", exc)
+            
+        self.writable.set()
+        self.rx_queue.put_nowait(None)
+        self.closed.set_result(None)
+        
+    def pause_writing(self):
+        self.writable.clear()
+        
+    def resume_writing(self):
+        self.writable.set()
+        
+    def _frame_received(self, frame: Frame):
+        """Reassemble data frames; control frames are answered by the state machine."""
+        opcode = frame.opcode
+        
+        if opcode is Opcode.CONT:
+            self._fragments.append(frame.data)
+            if not frame.fin:
+                return
+            opcode, self._fragment_opcode = self._fragment_opcode, None
+            data = b''.join(self._fragments)
+            self._fragments = []
+        elif opcode is Opcode.BINARY or opcode is Opcode.TEXT:
+            if not frame.fin:
+                self._fragments = [frame.data]
+                self._fragment_opcode = opcode
+                return
+            # The frame parser may hand back a bytearray
+            data = bytes(frame.data)
+        else:
+            if opcode is Opcode.PONG:
+                waiter = self._pings.pop(bytes(frame.data), None)
+                if waiter is not None and not waiter.done():
+                    waiter.set_result(None)
+            return
+            
+        # The opcode already says which callback the frame belongs to
+        if opcode is Opcode.TEXT:
+            handler = self.on_text
+            if self.decode_text:
+                try:
+                    data = data.decode('utf-8')
+                except UnicodeDecodeError:
+                    self.wsproto.fail(CloseCode.INVALID_DATA, "invalid UTF-8")
+                    return
+        else:
+            handler = self.on_binary
+            
+        queue = self.rx_queue
+        queue.put_nowait((handler, data))
+        
+        # Backpressure: stop reading the socket while the dispatcher catches up
+        if not self.paused and queue.qsize() >= RX_QUEUE_SIZE:
+            self.paused = True
+            self.transport.pause_reading()
+            
+    def ping(self) -> asyncio.Future:
+        """Send a ping; the returned future resolves when its pong arrives."""
+        payload = os.urandom(4)
+        waiter = asyncio.get_running_loop().create_future()
+        self._pings[payload] = waiter
+        self.wsproto.send_ping(payload)
+        self.flush()
+        return waiter
+        
+    def resume(self):
+        """Resume reading once the dispatcher has drained the backlog."""
+        self.paused = False
+        self.transport.resume_reading()
+        
+    def flush(self):
+        """Write everything the state machine has queued in one transport call."""
+        chunks = self.wsproto.data_to_send()
+        if not chunks:
+            return
+            
+        self.transport.write(b''.join(chunks))
+        
+        # An empty trailing chunk asks for the end of the stream
+        if not chunks[-1]:
+            if self.transport.can_write_eof():
+                self.transport.write_eof()
+            if self._close_timer is None:
+                self._close_timer = asyncio.get_running_loop().call_later(
+                    CLOSE_TIMEOUT, self.transport.close
+                )
+                
+    def close(self):
+        """Start the closing handshake."""
+        # Kept per socket, so a reconnect cannot clear it under the old dispatcher
+        self.closed_locally = True
+        
+        if self.transport.is_closing():
+            return
+            
+        with contextlib.suppress(Exception):
+            self.wsproto.send_close()
+        self.flush()
+        
+        if self._close_timer is None:
+            self._close_timer = asyncio.get_running_loop().call_later(
+                CLOSE_TIMEOUT, self.transport.abort
+            )
+
 class WebSocketConnection:
     """Manages WebSocket connection to WhatsApp Web servers."""
     
-    def __init__(self, url: str = "wss://w1.web.whatsapp.net/ws/chat"):
-        """Initialize WebSocket connection."""
+    __slots__ = (
+        'url', 'decode_text', 'websocket', 'is_connected', 'on_message', 'on_text', 'on_binary',
+        'on_close', '_protocol', '_rx_queue', '_dispatcher_task', '_tx_queue', '_writer_task',
+        '_keepalive_task'
+    )
+    
+    def __init__(
+        self,
+        url: str = "wss://w1.web.whatsapp.net/ws/chat",
+        decode_text: bool = True
+    ):
+        """
+        Initialize WebSocket connection.
+        
+        Text frames go to on_text and binary frames to on_binary; either
+        falls back to on_message when unset. Callbacks are read by connect().
+        
+        Args:
+            url: WebSocket server URL
+            decode_text: Decode text frames to str. When False, text frames are
+                delivered as raw bytes and skip UTF-8 validation.
+        """
         self.url = url
-        self.websocket: Optional[websockets.WebSocketServerProtocol] = None
+        self.decode_text = decode_text
+        self.websocket: Optional[ClientProtocol] = None
         self.is_connected = False
         self.on_message: Optional[Callable] = None
+        self.on_text: Optional[Callable] = None
+        self.on_binary: Optional[Callable] = None
         self.on_close: Optional[Callable] = None
+        self._protocol: Optional[_WsProtocol] = None
+        self._rx_queue: Optional[asyncio.Queue] = None
+        self._dispatcher_task: Optional[asyncio.Task] = None
+        self._tx_queue: Optional[asyncio.Queue] = None
+        self._writer_task: Optional[asyncio.Task] = None
+        self._keepalive_task: Optional[asyncio.Task] = None
         
     async def connect(self, headers: dict = None) -> bool:
         """Connect to WhatsApp Web servers."""
-        try:
-            logger.info(f"Connecting to {self.url}")
-            
-            # Default headers
-            default_headers = {
-                'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36',
-                'Origin': 'https://web.whatsapp.com'
-            }
+        # Reconnecting: retire the previous socket and its tasks first
+        if self._protocol is not None:
+            await self.close()
             
-            if headers:
-                default_headers.update(headers)
+        protocol = None
+        try:
+            logger.info("Connecting to %s", self.url)
             
-            # Connect with SSL
-            ssl_context = ssl._create_unverified_context()
+            # Merge only when the caller overrides something
+            request_headers = {**_DEFAULT_HEADERS, **headers} if headers else _DEFAULT_HEADERS
             
-            self.websocket = await websockets.connect(
-                self.url,
-                extra_headers=default_headers,
-                ssl=ssl_context,
-                timeout=10
-            )
+            # No extensions are offered: frames are encrypted binary and
+            # deflate costs CPU while saving nothing
+            wsuri = parse_uri(self.url)
+            wsproto = ClientProtocol(wsuri)
+            request = wsproto.connect()
+            for name, value in request_headers.items():
+                request.headers[name] = value
+                
+            # The receive queue is unbounded; the protocol pauses reading instead
+            rx_queue = asyncio.Queue()
+            loop = asyncio.get_running_loop()
+            on_text = self.on_text or self.on_message
+            on_binary = self.on_binary or self.on_message
             
+            async with asyncio.timeout(OPEN_TIMEOUT):
+                _, protocol = await loop.create_connection(
+                    lambda: _WsProtocol(
+                        wsproto, request, rx_queue, self.decode_text, on_text, on_binary, self._connection_lost
+                    ),
+                    wsuri.host,
+                    wsuri.port,
+                    ssl=_SSL_CONTEXT if wsuri.secure else None
+                )
+                await protocol.handshake
+                
+            self.websocket = wsproto
+            self._protocol = protocol
+            self._rx_queue = rx_queue
             self.is_connected = True
             logger.info("WebSocket connection established")
             
-            # Start message loop
-            asyncio.create_task(self._message_loop())
+            # Frames are dispatched in their own task, so slow handlers do
+            # not stall draining the socket
+            self._dispatcher_task = asyncio.create_task(self._dispatcher_loop(protocol), name='wa-rx')
+            
+            # Outgoing frames are coalesced by a single writer task
+            self._tx_queue = asyncio.Queue()
+            self._writer_task = asyncio.create_task(
+                self._writer_loop(protocol, self._tx_queue), name='wa-tx'
+            )
+            
+            # Detect half-open sockets the way websockets.connect did
+            self._keepalive_task = asyncio.create_task(self._keepalive_loop(protocol), name='wa-ping')
             
             return True
             
         except Exception as e:
-            logger.error(f"Connection failed: {e}")
+            logger.error("Connection failed: %s", e)
+            if protocol is not None and protocol.transport is not None:
+                protocol.transport.abort()
             self.is_connected = False
             return False
     
     async def send(self, data: bytes):
         """Send data through WebSocket."""
-        if self.websocket and self.is_connected:
-            await self.websocket.send(data)
+        if self._protocol and self.is_connected and self._tx_queue is not None:
+            future = asyncio.get_running_loop().create_future()
+            self._tx_queue.put_nowait((data, future))
+            await future
         else:
             raise Exception("WebSocket not connected")
     
     async def close(self):
         """Close WebSocket connection."""
-        if self.websocket:
-            await self.websocket.close()
+        protocol, self._protocol = self._protocol, None
+        if protocol:
+            # Refuse new sends, but let the writer finish frames already accepted
+            self.is_connected = False
+            await self._drain_writer(protocol)
+            await self._stop_writer()
+            await self._stop_keepalive()
+            protocol.close()
+            await asyncio.shield(protocol.closed)
+            await self._stop_dispatcher()
+            self.websocket = None
             self.is_connected = False
             logger.info("WebSocket connection closed")
     
-    async def _message_loop(self):
-        """Handle incoming messages."""
+    def _connection_lost(self):
+        """Mark the connection down the moment the transport goes away."""
+        # New sends fail fast; on_close runs after queued frames are dispatched
+        self.is_connected = False
+    
+    async def _writer_loop(self, protocol: _WsProtocol, queue: asyncio.Queue):
+        """Frame queued messages in batches and write each batch in one call."""
+        wsproto = protocol.wsproto
+        
+        while True:
+            batch = [await queue.get()]
+            size = len(batch[0][0])
+            while size < TX_BATCH_BYTES and not queue.empty():
+                item = queue.get_nowait()
+                batch.append(item)
+                size += len(item[0])
+                
+            sent = []
+            for data, future in batch:
+                if future.done():
+                    continue
+                try:
+                    if isinstance(data, str):
+                        wsproto.send_text(data.encode('utf-8'))
+                    else:
+                        wsproto.send_binary(data)
+                except Exception as e:
+                    future.set_exception(e)
+                else:
+                    sent.append(future)
+                    
+            # One transport write for the batch; wait only if it applies backpressure
+            try:
+                protocol.flush()
+                await protocol.writable.wait()
+            except asyncio.CancelledError:
+                for future in sent:
+                    if not future.done():
+                        future.set_exception(ConnectionError("WebSocket closed before frame was sent"))
+                raise
+                
+            for future in sent:
+                if not future.done():
+                    future.set_result(None)
+            for _ in batch:
+                queue.task_done()
+    
+    async def _drain_writer(self, protocol: _WsProtocol):
+        """Wait up to CLOSE_TIMEOUT for the writer to send every queued frame."""
+        queue, task = self._tx_queue, self._writer_task
+        if queue is None or task is None or task.done() or protocol.closed.done():
+            return
+            
+        # Cancelling is only the fallback for a peer that stopped reading
         try:
-            async for message in self.websocket:
-                if self.on_message:
-                    await self.on_message(message)
-        except websockets.exceptions.ConnectionClosed:
-            logger.info("WebSocket connection closed by server")
-            self.is_connected = False
-            if self.on_close:
-                await self.on_close()
-        except Exception as e:
-            logger.error(f"Message loop error: {e}")
-            self.is_connected = False
+            async with asyncio.timeout(CLOSE_TIMEOUT):
+                await queue.join()
+        except TimeoutError:
+            logger.warning("Timed out sending queued frames before close")
+    
+    async def _stop_writer(self):
+        """Stop the writer task and fail frames that were never sent."""
+        task, self._writer_task = self._writer_task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+                
+        queue, self._tx_queue = self._tx_queue, None
+        while queue is not None and not queue.empty():
+            _, future = queue.get_nowait()
+            if not future.done():
+                future.set_exception(ConnectionError("WebSocket closed before frame was sent"))
+    
+    async def _keepalive_loop(self, protocol: _WsProtocol):
+        """Ping every PING_INTERVAL seconds; drop the socket if a pong is late."""
+        closed = protocol.closed
+        
+        while True:
+            done, _ = await asyncio.wait((closed,), timeout=PING_INTERVAL)
+            if done:
+                return
+                
+            try:
+                pong = protocol.ping()
+            except Exception:
+                # Closing handshake already under way
+                return
+                
+            done, _ = await asyncio.wait((pong, closed), timeout=PING_TIMEOUT)
+            if closed.done():
+                return
+            if not done:
+                # Reported through on_close like any other dropped connection
+                logger.warning("Keepalive ping timed out, dropping connection")
+                protocol.transport.abort()
+                return
+    
+    async def _stop_keepalive(self):
+        """Cancel the keepalive task."""
+        task, self._keepalive_task = self._keepalive_task, None
+        if task is not None:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    
+    async def _stop_dispatcher(self):
+        """Wait for the dispatcher to hand off the frames it already has and exit."""
+        task, self._dispatcher_task = self._dispatcher_task, None
+        
+        # close() may be called from a handler or on_close, i.e. from the dispatcher itself
+        if task is not None and task is not asyncio.current_task():
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+    
+    async def _dispatcher_loop(self, protocol: _WsProtocol):
+        """Hand queued frames to their handlers in arrival order."""
+        # Bound up front: close() may detach the protocol before this task first runs
+        queue = protocol.rx_queue
+        get = queue.get
+        qsize = queue.qsize
+        
+        # The protocol enqueues (handler, frame) pairs, then None once the transport is gone
+        while (item := await get()) is not None:
+            if protocol.paused and qsize() <= RX_QUEUE_SIZE // 2:
+                protocol.resume()
+                
+            handler, message = item
+            if handler:
+                try:
+                    await handler(message)
+                except Exception as e:
+                    logger.error("Message handler error: %s", e)
+                    
+        # A handler may already have reconnected; only stop this socket's writer
+        if self._protocol is protocol:
+            await self._stop_writer()
+        
+        # on_close reports closes we did not ask for, as before
+        if protocol.closed_locally:
+            return
+            
+        logger.info("WebSocket connection closed by server")
+        if self.on_close:
+            await self.on_close()
@@ -3,13 +3,17 @@ WebSocket message handler for WhatsApp Web protocol.
 """
 
 import asyncio
-from typing import Callable, Optional, Dict, Any
+from typing import Callable, Optional, Dict, Any, Union
 from ..utils.logger import get_logger
 from ..protocol.binary_reader import BinaryReader
 from ..protocol.binary_writer import BinaryWriter
 
 logger = get_logger(__name__)
 
+# Connection-establishment tags for text frames delivered undecoded (decode_text=False)
+_CHALLENGE_BYTES = b'challenge'
+_SUCCESS_BYTES = b'success'
+
 class WebSocketHandler:
     """Handles WebSocket messages and protocol communication."""
     
@@ -23,6 +27,11 @@ class WebSocketHandler:
         """Register a handler for specific message type."""
         self.message_handlers[message_type] = handler
         
+    def attach(self, connection):
+        """Route a connection's text and binary frames straight to this handler (before connect())."""
+        connection.on_text = self._handle_text_message
+        connection.on_binary = self._handle_binary_message
+        
     async def handle_message(self, raw_message: bytes):
         """Handle incoming WebSocket message."""
         try:
@@ -35,16 +44,21 @@ class WebSocketHandler:
                 await self._handle_binary_message(raw_message)
                 
         except Exception as e:
-            logger.error(f"Error handling message: {e}")
+            logger.error("Error handling message: %s", e)
     
-    async def _handle_text_message(self, message: str):
-        """Handle text-based messages."""
-        logger.debug(f"Received text message: {message}")
+    async def _handle_text_message(self, message: Union[str, bytes]):
+        """Handle text-based messages, decoded or as raw UTF-8 bytes."""
+        logger.debug("Received text message: %s", message)
         
-        # Handle connection establishment messages
-        if "challenge" in message:
+        # Handle connection establishment messages (challenge wins over success);
+        # raw frames stay bytes so a JSON payload can go to orjson.loads as is
+        if isinstance(message, str):
+            challenge, success = 'challenge', 'success'
+        else:
+            challenge, success = _CHALLENGE_BYTES, _SUCCESS_BYTES
+        if challenge in message:
             await self._handle_challenge(message)
-        elif "success" in message:
+        elif success in message:
             await self._handle_success(message)
     
     async def _handle_binary_message(self, message: bytes):
@@ -55,14 +69,15 @@ class WebSocketHandler:
             
             message_type = decoded.get('type', 'unknown')
             
-            # Route to appropriate handler
-            if message_type in self.message_handlers:
-                await self.message_handlers[message_type](decoded)
+            # Route to appropriate handler (one dict probe)
+            handler = self.message_handlers.get(message_type)
+            if handler is not None:
+                await handler(decoded)
             else:
-                logger.debug(f"Unhandled message type: {message_type}")
+                logger.debug("Unhandled message type: %s", message_type)
                 
         except Exception as e:
-            logger.error(f"Error decoding binary message: {e}")
+            logger.error("Error decoding binary message: %s", e)
     
     async def _handle_challenge(self, message: str):
         """Handle authentication challenge."""